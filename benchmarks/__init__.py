@@ -0,0 +1,32 @@
+"""Benchmarks for the books library project.
+
+Run a benchmark from the project root with
+``python -m benchmarks.<benchmark module> --help``. Benchmarks run against
+a throwaway SQLite database and never touch the project's own database.
+"""
+import os
+import time
+from pathlib import Path
+from typing import Callable
+
+
+def setup_django(database_name: Path):
+    """Set up Django with the default database replaced by database_name.
+
+    :param database_name: The SQLite database file to use.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'books_library.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.DATABASES['default']['NAME'] = database_name
+
+
+def best_time(func: Callable, repeat: int = 3) -> float:
+    """Get the best wall time in seconds of repeat calls to func."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
@@ -0,0 +1,179 @@
+"""Benchmark the catalog and polls views served by WSGI and by ASGI.
+
+Fills a throwaway database with --books books and --questions polls and
+serves --requests requests for each of the catalog's and the polls' read
+views (or each --path given), once through Django's WSGI handler by a pool
+of --workers threads, like a threaded WSGI server, and once through
+Django's ASGI handler on a single event loop with up to --clients requests
+in flight, like a uvicorn worker. Every response must be a 200.
+
+By default clients receive instantly, so the throughput is the views'
+own. With --client-delay, each client takes that many seconds to receive
+its response: a WSGI worker is tied up for as long as its client is
+receiving, an ASGI worker is not.
+
+    python -m benchmarks.asgi_vs_wsgi --requests 500
+    python -m benchmarks.asgi_vs_wsgi --client-delay 0.2
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import setup_django
+
+SERVER_NAME = 'localhost'
+
+
+def populate(book_count: int, question_count: int):
+    from catalog.models import Book, Categories
+    from polls.utils import repopulate_polls
+
+    categories = Categories.objects.create(name='Benchmark')
+    Book.objects.bulk_create(
+        Book(isbn=f'{id_:013d}', title=f'Title {id_}',
+             publication_year=1900 + id_ % 120, categories=categories,
+             page_count=0, average_rating=5, ratings_count=0)
+        for id_ in range(1, book_count + 1))
+    repopulate_polls(question_count)
+
+
+def view_paths() -> list[str]:
+    """Get a path of each of the catalog's and the polls' read views."""
+    from catalog.models import Book
+    from polls.models import Question
+
+    book_id = Book.objects.values_list('id', flat=True).first()
+    question_id = Question.objects.values_list('id', flat=True).first()
+    return [
+        '/catalog/',
+        f'/catalog/book/{book_id}',
+        '/catalog/search?q=title',
+        '/polls/',
+        f'/polls/{question_id}/details',
+        f'/polls/{question_id}/results',
+    ]
+
+
+def wsgi_throughput(path: str, request_count: int, worker_count: int,
+                    client_delay: float) -> float:
+    from django.core.handlers.wsgi import WSGIHandler
+    from django.db import connection
+
+    handler = WSGIHandler()
+    path_info, _, query_string = path.partition('?')
+
+    def start_response(status, headers):
+        if not status.startswith('200'):
+            raise RuntimeError(f'{path} responded {status}.')
+
+    def serve(_):
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path_info,
+            'QUERY_STRING': query_string,
+            'SERVER_NAME': SERVER_NAME,
+            'SERVER_PORT': '80',
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': None,
+        }
+        response = handler(environ, start_response)
+        try:
+            for _ in response:
+                if client_delay:
+                    # The worker is blocked while the slow client receives.
+                    time.sleep(client_delay)
+        finally:
+            response.close()
+            connection.close()
+
+    # Compiles the templates and warms the caches outside the timing.
+    serve(None)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=worker_count) as executor:
+        list(executor.map(serve, range(request_count)))
+    return request_count / (time.perf_counter() - start)
+
+
+def asgi_throughput(path: str, request_count: int, client_count: int,
+                    client_delay: float) -> float:
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+    path_info, _, query_string = path.partition('?')
+    scope = {
+        'type': 'http',
+        'method': 'GET',
+        'path': path_info,
+        'query_string': query_string.encode(),
+        'headers': [(b'host', SERVER_NAME.encode())],
+        'server': (SERVER_NAME, 80),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            if message['status'] != 200:
+                raise RuntimeError(
+                    f'{path} responded {message["status"]}.')
+        elif message['type'] == 'http.response.body' and client_delay:
+            # Other requests are served while the slow client receives.
+            await asyncio.sleep(client_delay)
+
+    async def serve_all():
+        clients = asyncio.Semaphore(client_count)
+
+        async def serve():
+            async with clients:
+                await handler(scope, receive, send)
+
+        # Compiles the templates and warms the caches outside the timing.
+        await serve()
+        start = time.perf_counter()
+        await asyncio.gather(*(serve() for _ in range(request_count)))
+        return time.perf_counter() - start
+
+    return request_count / asyncio.run(serve_all())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=1000)
+    parser.add_argument('--questions', type=int, default=100)
+    parser.add_argument(
+        '--path', action='append', dest='paths',
+        help='A path to serve, repeatable (default: every read view).')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--client-delay', type=float, default=0)
+    args = parser.parse_args()
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        setup_django(Path(temp_dir) / 'benchmark.sqlite3')
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        print(f'Populating {args.books} books and {args.questions} '
+              f'polls...')
+        populate(args.books, args.questions)
+        for path in args.paths or view_paths():
+            results.append((
+                path,
+                wsgi_throughput(path, args.requests, args.workers,
+                                args.client_delay),
+                asgi_throughput(path, args.requests, args.clients,
+                                args.client_delay)))
+    print(f'requests/s, WSGI with {args.workers} worker threads, ASGI with '
+          f'{args.clients} concurrent clients')
+    print(f'{"path":<32}{"WSGI":>10}{"ASGI":>10}{"ASGI/WSGI":>11}')
+    for path, wsgi, asgi in results:
+        print(f'{path:<32}{wsgi:>10.1f}{asgi:>10.1f}{asgi / wsgi:>10.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark catalog hot lookups before and after the lookup indexes.
+
+Fills a throwaway database with --books books at the initial catalog
+schema, times the lookups, migrates to the latest catalog schema (unique
+names, unique ISBN, unique book-author pairs and the title and
+publication year indexes) and times them again.
+
+    python -m benchmarks.catalog_lookups --books 1000000
+"""
+import argparse
+import random
+import tempfile
+from pathlib import Path
+
+from . import best_time, setup_django
+
+
+def populate(book_count: int):
+    from django.db import connection, transaction
+
+    author_count = max(book_count // 10, 1)
+    categories_count = max(book_count // 1000, 1)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO catalog_categories (id, name) VALUES (%s, %s)',
+            ((id_, f'Category {id_}')
+             for id_ in range(1, categories_count + 1)))
+        cursor.executemany(
+            'INSERT INTO catalog_author (id, name) VALUES (%s, %s)',
+            ((id_, f'Author {id_}') for id_ in range(1, author_count + 1)))
+        cursor.executemany(
+            'INSERT INTO catalog_book (id, isbn, title, publication_year,'
+            ' categories_id, page_count, average_rating, ratings_count)'
+            ' VALUES (%s, %s, %s, %s, %s, 0, 5, 0)',
+            ((id_, f'{id_:013d}', f'Title {id_}', 1900 + id_ % 120,
+              1 + id_ % categories_count)
+             for id_ in range(1, book_count + 1)))
+        cursor.executemany(
+            'INSERT INTO catalog_booksauthors (book_id, author_id)'
+            ' VALUES (%s, %s)',
+            ((id_, 1 + id_ % author_count)
+             for id_ in range(1, book_count + 1)))
+    return author_count, categories_count
+
+
+def lookups(book_count: int, author_count: int, categories_count: int,
+            lookup_count: int) -> dict:
+    from catalog.models import Author, Book, BooksAuthors, Categories
+
+    rng = random.Random(0)
+    book_ids = [rng.randint(1, book_count) for _ in range(lookup_count)]
+    author_ids = [rng.randint(1, author_count) for _ in range(lookup_count)]
+    categories_ids = [
+        rng.randint(1, categories_count) for _ in range(lookup_count)]
+    # Only the initial schema's columns are selected, later migrations add
+    # columns that the current models select by default.
+    return {
+        'Author by name': lambda: [
+            Author.objects.values_list('id', flat=True).get(
+                name=f'Author {id_}') for id_ in author_ids],
+        'Categories by name': lambda: [
+            Categories.objects.values_list('id', flat=True).get(
+                name=f'Category {id_}')
+            for id_ in categories_ids],
+        'Book by ISBN': lambda: [
+            Book.objects.values_list('id', 'title').get(
+                isbn=f'{id_:013d}') for id_ in book_ids],
+        'Book by title': lambda: [
+            list(Book.objects.filter(title=f'Title {id_}').values_list(
+                'id', 'isbn'))
+            for id_ in book_ids],
+        'Books count by publication year': lambda: [
+            Book.objects.filter(publication_year=1900 + id_ % 120).count()
+            for id_ in book_ids[:max(lookup_count // 100, 1)]],
+        'Book-author pair exists': lambda: [
+            BooksAuthors.objects.filter(
+                book_id=id_, author_id=1 + id_ % author_count).exists()
+            for id_ in book_ids],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=100)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        setup_django(Path(temp_dir) / 'benchmark.sqlite3')
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+        call_command('migrate', 'catalog', '0001', verbosity=0)
+        print(f'Populating {args.books} books...')
+        counts = populate(args.books)
+        benchmarks = lookups(args.books, *counts, args.lookups)
+        before = {
+            name: best_time(func) for name, func in benchmarks.items()}
+        print('Migrating to the latest catalog schema...')
+        call_command('migrate', 'catalog', verbosity=0)
+        after = {
+            name: best_time(func) for name, func in benchmarks.items()}
+    print(f'{"lookup":<32}{"before (s)":>12}{"after (s)":>12}{"speedup":>10}')
+    for name in benchmarks:
+        print(f'{name:<32}{before[name]:>12.4f}{after[name]:>12.4f}'
+              f'{before[name] / after[name]:>9.0f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark bulk secret token generation against rejection sampling.
+
+Generates --tokens tokens with utils.secret.gen_secret_tokens, which builds
+every token to satisfy its character groups, and with the rejection
+sampling generator it replaced, which draws random tokens until one
+contains enough characters of every group. Stricter policies (shorter
+tokens for the same groups) make rejection sampling slower and failing.
+
+    python -m benchmarks.secret_tokens --tokens 10000
+    python -m benchmarks.secret_tokens --min-length 24 --max-length 26
+"""
+import argparse
+from secrets import choice, randbelow
+
+from utils.secret import (
+    DEFAULT_CHARACTER_GROUPS, TokenGenerationError, gen_secret_tokens)
+
+from . import best_time
+
+
+def rejection_sampling_token(
+        min_token_length: int = 50, max_token_length: int = 60,
+        character_groups=DEFAULT_CHARACTER_GROUPS,
+        max_token_generation_attempts: int = 100) -> str:
+    """The rejection sampling generator, as it was."""
+    token_characters = ''.join(
+        character_group for character_group, _ in character_groups)
+    for _ in range(max_token_generation_attempts):
+        candidate_token = ''.join(
+            choice(token_characters) for _ in range(
+                min_token_length
+                + randbelow(max_token_length - min_token_length)))
+        if all(
+                sum(
+                    character in candidate_token
+                    for character in character_group
+                ) > min_group_characters
+                for character_group, min_group_characters
+                in character_groups):
+            return candidate_token
+    raise TokenGenerationError('Failed to generate secret token.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tokens', type=int, default=10_000)
+    parser.add_argument('--min-length', type=int, default=50)
+    parser.add_argument('--max-length', type=int, default=60)
+    args = parser.parse_args()
+    failures = 0
+
+    def rejection_sampling_tokens():
+        nonlocal failures
+        failures = 0
+        for _ in range(args.tokens):
+            try:
+                rejection_sampling_token(args.min_length, args.max_length)
+            except TokenGenerationError:
+                failures += 1
+
+    rejection_sampling = best_time(rejection_sampling_tokens)
+    constructive = best_time(lambda: gen_secret_tokens(
+        args.tokens, args.min_length, args.max_length))
+    print(f'{"generator":<24}{"tokens/s":>12}{"failures":>10}')
+    print(f'{"rejection sampling":<24}'
+          f'{args.tokens / rejection_sampling:>12.0f}{failures:>10}')
+    print(f'{"constructive":<24}{args.tokens / constructive:>12.0f}{0:>10}')
+    print(f'{"speedup":<24}{rejection_sampling / constructive:>11.1f}x')
+
+
+if __name__ == '__main__':
+    main()
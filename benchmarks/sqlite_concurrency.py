@@ -0,0 +1,134 @@
+"""Benchmark concurrent SQLite reads and writes with and without tuning.
+
+Fills a throwaway database with --books books, then for --duration seconds
+runs --writers threads committing small write transactions (like votes or
+importer batches) alongside --readers threads reading books, and counts
+the operations each side completed. This is done once with SQLite's
+default rollback journal and once with the SQLITE_PRAGMAS setting (WAL
+journaling and friends), each on its own database file.
+
+    python -m benchmarks.sqlite_concurrency --readers 8 --duration 5
+"""
+import argparse
+import random
+import tempfile
+import threading
+from pathlib import Path
+
+from . import setup_django
+
+# SQLite's own defaults.
+ROLLBACK_JOURNAL_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'mmap_size': 0,
+    'cache_size': -2000,
+    'busy_timeout': 5000,
+}
+
+
+def populate(book_count: int):
+    from catalog.models import Book, Categories
+
+    categories = Categories.objects.create(name='Benchmark')
+    Book.objects.bulk_create(
+        Book(isbn=f'{id_:013d}', title=f'Title {id_}',
+             publication_year=1900 + id_ % 120, categories=categories,
+             page_count=0, average_rating=5, ratings_count=0)
+        for id_ in range(1, book_count + 1))
+
+
+def run_workload(book_count: int, reader_count: int, writer_count: int,
+                 duration: float) -> tuple[int, int, int]:
+    from django.db import OperationalError, connection, transaction
+    from django.db.models import F
+    from catalog.models import Book
+
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    counts_lock = threading.Lock()
+
+    def count(name):
+        with counts_lock:
+            counts[name] += 1
+
+    def reader(seed):
+        rng = random.Random(seed)
+        try:
+            while not stop.is_set():
+                try:
+                    list(Book.objects.filter(
+                        title__gte=f'Title {rng.randint(1, book_count)}'
+                    ).order_by('title')[:20])
+                    count('reads')
+                except OperationalError:
+                    count('errors')
+        finally:
+            connection.close()
+
+    def writer(seed):
+        rng = random.Random(seed)
+        try:
+            while not stop.is_set():
+                try:
+                    with transaction.atomic():
+                        Book.objects.filter(
+                            id=rng.randint(1, book_count)).update(
+                            ratings_count=F('ratings_count') + 1)
+                    count('writes')
+                except OperationalError:
+                    count('errors')
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=reader, args=(seed,))
+        for seed in range(reader_count)
+    ] + [
+        threading.Thread(target=writer, args=(-seed - 1,))
+        for seed in range(writer_count)
+    ]
+    for thread in threads:
+        thread.start()
+    stop.wait(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return counts['reads'], counts['writes'], counts['errors']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        setup_django(Path(temp_dir) / 'benchmark.sqlite3')
+        from django.conf import settings
+        from django.core.management import call_command
+        from django.db import connections
+
+        results = {}
+        for profile, pragmas in (
+                ('rollback journal', ROLLBACK_JOURNAL_PRAGMAS),
+                ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS)):
+            connections.close_all()
+            settings.SQLITE_PRAGMAS = pragmas
+            settings.DATABASES['default']['NAME'] = (
+                Path(temp_dir) / f'{pragmas["journal_mode"]}.sqlite3')
+            call_command('migrate', verbosity=0)
+            print(f'Populating {args.books} books ({profile})...')
+            populate(args.books)
+            connections.close_all()
+            results[profile] = run_workload(
+                args.books, args.readers, args.writers, args.duration)
+    print(f'{"profile":<20}{"reads/s":>12}{"writes/s":>12}{"errors":>8}')
+    for profile, (reads, writes, errors) in results.items():
+        print(f'{profile:<20}{reads / args.duration:>12.1f}'
+              f'{writes / args.duration:>12.1f}{errors:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -10,10 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
 
+from utils.database import get_database_settings
 from utils.secret import get_django_secret_token
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -24,6 +26,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/4.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
+# Taken from the DJANGO_SECRET_KEY environment variable, or else from
+# SECRET_KEY_FILE (generated on first use).
 SECRET_KEY_FILE = BASE_DIR / '.secret'
 SECRET_KEY = get_django_secret_token(SECRET_KEY_FILE)
 
@@ -42,9 +46,10 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'utils.apps.UtilsConfig',
     'catalog.apps.MainConfig',
     'site_index.apps.SiteIndexConfig',
-    # 'polls.apps.PollsConfig',
+    'polls.apps.PollsConfig',
     # 'user_manager.apps.UserManagerConfig',
 ]
 
@@ -56,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'catalog.middleware.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'books_library.urls'
@@ -85,12 +91,50 @@ WSGI_APPLICATION = 'books_library.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
+# Set from the DATABASE_URL and DATABASE_* environment variables, see
+# utils/database.py.
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': get_database_settings(
+        default_url='sqlite:///db.sqlite3', base_dir=BASE_DIR),
+}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Test on a database file like the deployed one: an in-memory test
+    # database fails lock waits at once instead of waiting for busy_timeout.
+    DATABASES['default']['TEST'] = {
+        'NAME': BASE_DIR / 'test_db.sqlite3'}
+
+# Read replicas of the default database, as space separated database URLs
+# in DATABASE_REPLICA_URLS. Catalog browsing reads from them, see
+# catalog/routers.py.
+DATABASE_REPLICAS = []
+for replica_number, replica_url in enumerate(
+        os.environ.get('DATABASE_REPLICA_URLS', '').split(), start=1):
+    DATABASES[f'replica_{replica_number}'] = get_database_settings(
+        default_url='', base_dir=BASE_DIR,
+        environ={**os.environ, 'DATABASE_URL': replica_url})
+    # Tests read the replicas' data from the test default database.
+    DATABASES[f'replica_{replica_number}']['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(f'replica_{replica_number}')
+DATABASE_ROUTERS = ['catalog.routers.ReplicaRouter']
+# Seconds to read from the default database after a write request, so
+# that the client sees its writes despite replication lag.
+REPLICA_PIN_SECONDS = 5
+
+# Pragmas applied to every new SQLite connection by the utils app, see
+# https://www.sqlite.org/pragma.html
+# WAL lets readers go on while a writer commits, and with it
+# synchronous=NORMAL only syncs the log at checkpoints.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    # Bytes of the database file to memory map for reads.
+    'mmap_size': 256 * 1024 * 1024,
+    # Negative sizes are in KiB rather than pages.
+    'cache_size': -64 * 1024,
+    # Milliseconds to wait for a lock before failing with "database is
+    # locked".
+    'busy_timeout': 5000,
 }
 
 
@@ -135,9 +179,20 @@ STATIC_URL = 'static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/4.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 # Custom installed application settings
 
 # -- application: site_index
+# Seconds to keep the index page's cached greeting and application list.
+SITE_INDEX_CACHE_TIMEOUT = 3600
 APPLICATION_URLS = [
     # {
     #     "url": "admin/",
@@ -157,3 +212,22 @@ APPLICATION_URLS = [
     # },
 ]
 
+# -- application: polls
+# Buffer votes in memory and flush them every POLLS_VOTE_FLUSH_INTERVAL
+# seconds instead of writing every vote as it comes.
+POLLS_VOTE_WRITE_BEHIND = False
+POLLS_VOTE_FLUSH_INTERVAL = 1.0
+# Seconds to keep a question's cached results.
+POLLS_RESULTS_CACHE_TIMEOUT = 60
+# Seconds to keep the index page's latest questions at most, they also
+# expire as soon as the next future question is published.
+POLLS_INDEX_CACHE_TIMEOUT = 10
+
+# -- application: catalog
+# The categories and authors lookups cached per process (see
+# catalog.lookups), and for how many seconds.
+CATALOG_LOOKUP_CACHE_MAX_SIZE = 10_000
+CATALOG_LOOKUP_CACHE_TIMEOUT = 300
+# The alias of a CACHES cache shared by the processes' lookup caches, e.g.
+# a Redis or Memcached cache, None to only cache per process.
+CATALOG_LOOKUP_SHARED_CACHE = None
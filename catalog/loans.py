@@ -0,0 +1,257 @@
+"""Lending, returning, renewing and reserving book copies.
+
+Every operation runs in a transaction that locks the copies it looks at
+with SELECT ... FOR UPDATE (skipping copies locked by concurrent
+checkouts and reservations of the same book), and changes a copy's status
+with an UPDATE conditional on the status it was read with, so two
+borrowers never get the same copy. The book's copy counters are kept up
+to date in the same transaction.
+
+SQLite has no row locks, and a transaction that read before writing
+fails instead of waiting when another writer committed meanwhile. So on
+SQLite the transactions take the database's write lock up front (see
+_write_transaction), which makes concurrent operations wait for each
+other up to the busy_timeout of SQLITE_PRAGMAS.
+
+The nightly process_overdue_copies command marks overdue loans and expires
+reservations with mark_overdue_copies and expire_reservations, in short
+transactions over keyset paginated chunks of copies.
+"""
+import datetime
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Book, BookCopy
+
+LOAN_PERIOD = timedelta(weeks=3)
+RESERVATION_PERIOD = timedelta(days=3)
+# The number of candidate copies locked at once per checkout or reservation.
+MAX_CANDIDATE_COPIES = 10
+# The number of copies processed per transaction by the overdue processing.
+DEFAULT_BATCH_SIZE = 1000
+
+LoanStatus = BookCopy.LoanStatus
+
+
+class LoanError(Exception):
+    pass
+
+
+@contextmanager
+def _write_transaction():
+    """An atomic block that on SQLite starts by taking the write lock.
+
+    SQLite transactions begin deferred, as readers, and a reader whose
+    snapshot is outdated by a concurrent commit can't become a writer, so
+    it fails with "database is locked" without waiting. A first statement
+    that writes (nothing) takes the write lock before anything is read.
+    """
+    with transaction.atomic():
+        connection = transaction.get_connection()
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'UPDATE {BookCopy._meta.db_table} SET id = id WHERE 0')
+        yield
+
+
+def _change_status(book_copy: BookCopy, status: str, **fields) -> bool:
+    """Change book_copy's status unless it changed since it was read.
+
+    :return: True if the copy was changed, False if it changed meanwhile.
+    """
+    if not BookCopy.objects.filter(
+            pk=book_copy.pk, status=book_copy.status).update(
+            status=status, **fields):
+        return False
+    book_copy.status = status
+    for field_name, value in fields.items():
+        setattr(book_copy, field_name, value)
+    book_copy.update_copy_counters()
+    return True
+
+
+def _take_copy(candidates, status: str, **fields) -> BookCopy:
+    candidates = candidates.select_for_update(skip_locked=True)
+    while book_copies := list(candidates[:MAX_CANDIDATE_COPIES]):
+        for book_copy in book_copies:
+            if _change_status(book_copy, status, **fields):
+                return book_copy
+        # Every copy changed since it was read, look further.
+        candidates = candidates.exclude(
+            pk__in=[book_copy.pk for book_copy in book_copies])
+    raise LoanError('No copy of the book is available.')
+
+
+def _get_locked_copy(book_copy_id) -> BookCopy:
+    try:
+        return BookCopy.objects.select_for_update().get(pk=book_copy_id)
+    except BookCopy.DoesNotExist:
+        raise LoanError(f'No book copy {book_copy_id}.') from None
+
+
+def checkout(book_id: int, borrower, today: datetime.date = None) -> BookCopy:
+    """Lend borrower a copy of a book for LOAN_PERIOD.
+
+    A copy reserved for borrower is lent first, otherwise any available
+    copy.
+
+    :param book_id: The id of the book to lend a copy of.
+    :param borrower: The user borrowing the copy.
+    :param today: The date of the checkout, defaults to today.
+    :return: The lent copy.
+    :raise LoanError: If no copy is available.
+    """
+    today = today or timezone.localdate()
+    candidates = BookCopy.objects.filter(book_id=book_id).filter(
+        Q(status=LoanStatus.AVAILABLE)
+        | Q(status=LoanStatus.RESERVED, borrower=borrower))
+    with _write_transaction():
+        # Reserved ('R') copies before available ('A') ones.
+        return _take_copy(
+            candidates.order_by('-status'), LoanStatus.ON_LOAN,
+            borrower=borrower, due_back=today + LOAN_PERIOD)
+
+
+def reserve(book_id: int, borrower, today: datetime.date = None) -> BookCopy:
+    """Hold an available copy of a book for borrower for RESERVATION_PERIOD.
+
+    :param book_id: The id of the book to reserve a copy of.
+    :param borrower: The user reserving the copy.
+    :param today: The date of the reservation, defaults to today.
+    :return: The reserved copy.
+    :raise LoanError: If no copy is available.
+    """
+    today = today or timezone.localdate()
+    with _write_transaction():
+        return _take_copy(
+            BookCopy.objects.filter(
+                book_id=book_id, status=LoanStatus.AVAILABLE),
+            LoanStatus.RESERVED, borrower=borrower,
+            due_back=today + RESERVATION_PERIOD)
+
+
+def renew(book_copy_id, borrower, today: datetime.date = None) -> BookCopy:
+    """Extend borrower's loan of a copy to LOAN_PERIOD from today.
+
+    :param book_copy_id: The id of the copy on loan.
+    :param borrower: The user borrowing the copy.
+    :param today: The date of the renewal, defaults to today.
+    :return: The renewed copy.
+    :raise LoanError: If the copy isn't on loan to borrower.
+    """
+    today = today or timezone.localdate()
+    with _write_transaction():
+        book_copy = _get_locked_copy(book_copy_id)
+        if (book_copy.status != LoanStatus.ON_LOAN
+                or book_copy.borrower_id != borrower.pk):
+            raise LoanError('The book copy is not on loan to the borrower.')
+        book_copy.due_back = today + LOAN_PERIOD
+        book_copy.marked_overdue_on = None
+        book_copy.save(update_fields=['due_back', 'marked_overdue_on'])
+        return book_copy
+
+
+def return_copy(book_copy_id) -> BookCopy:
+    """Make a copy on loan or reserved available again.
+
+    :param book_copy_id: The id of the returned copy.
+    :return: The returned copy.
+    :raise LoanError: If the copy is neither on loan nor reserved.
+    """
+    with _write_transaction():
+        book_copy = _get_locked_copy(book_copy_id)
+        if book_copy.status not in (LoanStatus.ON_LOAN, LoanStatus.RESERVED):
+            raise LoanError('The book copy is neither on loan nor reserved.')
+        if not _change_status(
+                book_copy, LoanStatus.AVAILABLE, borrower=None,
+                due_back=None, marked_overdue_on=None):
+            raise LoanError('The book copy changed while returning it.')
+        return book_copy
+
+
+def overdue_copies(today: datetime.date = None):
+    """Get the copies on loan past their due date.
+
+    A single range scan of the (status, due_back) index.
+    """
+    return BookCopy.objects.filter(
+        status=LoanStatus.ON_LOAN,
+        due_back__lt=today or timezone.localdate())
+
+
+def next_due_back(book_id: int) -> datetime.date | None:
+    """Get the date the next copy on loan of a book is due back.
+
+    A single lookup in the (book, status, due_back) index.
+    """
+    return BookCopy.objects.filter(
+        book_id=book_id, status=LoanStatus.ON_LOAN).order_by(
+        'due_back').values_list('due_back', flat=True).first()
+
+
+def _due_back_chunks(queryset, batch_size: int) -> Iterator[list]:
+    """Split queryset into chunks of copy ids, in (due_back, id) order.
+
+    Every chunk is read with its own keyset query continuing after the
+    previous chunk's last copy, so that no query scans or holds more than
+    batch_size copies however many there are.
+    """
+    queryset = queryset.order_by('due_back', 'id').values_list(
+        'due_back', 'id')
+    chunk = queryset
+    while rows := list(chunk[:batch_size]):
+        yield [book_copy_id for _, book_copy_id in rows]
+        last_due_back, last_id = rows[-1]
+        chunk = queryset.filter(
+            Q(due_back__gt=last_due_back)
+            | Q(due_back=last_due_back, id__gt=last_id))
+
+
+def mark_overdue_copies(
+        today: datetime.date = None, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[int]:
+    """Mark the copies on loan past their due date as overdue today.
+
+    Loans are marked once, until they're renewed or returned.
+
+    :param today: The processing date, defaults to today.
+    :param batch_size: The number of copies marked per transaction.
+    :return: An iterator marking a chunk of copies per step and yielding
+        the number of copies it marked.
+    """
+    today = today or timezone.localdate()
+    overdue = overdue_copies(today).filter(marked_overdue_on__isnull=True)
+    for book_copy_ids in _due_back_chunks(overdue, batch_size):
+        # Loans may be returned or renewed since the chunk was read.
+        yield overdue.filter(id__in=book_copy_ids).update(
+            marked_overdue_on=today)
+
+
+def expire_reservations(
+        today: datetime.date = None, batch_size: int = DEFAULT_BATCH_SIZE
+) -> Iterator[int]:
+    """Make the copies reserved past their reservation period available.
+
+    :param today: The processing date, defaults to today.
+    :param batch_size: The number of copies made available per transaction.
+    :return: An iterator expiring a chunk of reservations per step and
+        yielding the number of reservations it expired.
+    """
+    expired = BookCopy.objects.filter(
+        status=LoanStatus.RESERVED,
+        due_back__lt=today or timezone.localdate())
+    for book_copy_ids in _due_back_chunks(expired, batch_size):
+        with _write_transaction():
+            chunk = expired.filter(id__in=book_copy_ids)
+            book_ids = set(chunk.values_list('book_id', flat=True))
+            expired_count = chunk.update(
+                status=LoanStatus.AVAILABLE, borrower=None, due_back=None)
+            # QuerySet.update bypasses the copy counters' maintenance.
+            Book.reconcile_copy_counters(book_ids)
+        yield expired_count
@@ -0,0 +1,250 @@
+"""Cached id and name lookups of the catalog's categories and authors.
+
+Categories and authors are few and hot: every rendered book shows its
+category. categories_lookup and authors_lookup answer lookups by id and
+by name from a process local least recently used cache bounded to
+CATALOG_LOOKUP_CACHE_MAX_SIZE entries, backed by the
+CATALOG_LOOKUP_SHARED_CACHE Django cache (if set) shared between
+processes, and only query the database on misses.
+
+Entries expire after CATALOG_LOOKUP_CACHE_TIMEOUT seconds. They're also
+invalidated by the catalog's signal receivers when a category or author
+is saved or deleted, which bounds the staleness left by bulk updates that
+send no signals to the timeout. Lookup results are only cached once the
+transaction reading them commits, so rolled back rows are never cached.
+
+Since entries may be stale until then, the lookups are meant for display.
+Ids written into rows, such as the importer's, are read from the
+database.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Model
+
+from .models import Author, Categories
+
+DEFAULT_MAX_SIZE = 10_000
+DEFAULT_TIMEOUT = 300
+
+
+class LookupStats(NamedTuple):
+    hits: int
+    misses: int
+
+
+class LRUCache:
+    """A thread safe least recently used cache with a size bound and TTL."""
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        # Keys to (value, expiry time), least recently used first.
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[Hashable]) -> dict:
+        """Get the values of the given keys that are cached and fresh."""
+        now = time.monotonic()
+        values = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                value, expires_at = entry
+                if expires_at <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                values[key] = value
+        return values
+
+    def set_many(self, mapping: dict):
+        expires_at = time.monotonic() + self.timeout
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[Hashable]):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class NameLookup:
+    """Cached lookups of a model with a unique name field.
+
+    Cached by ('id', id) -> name and by ('name', name) -> id.
+    """
+
+    def __init__(self, model: type[Model]):
+        self.model = model
+        self._local = None
+        self._hits = self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def local(self) -> LRUCache:
+        if self._local is None:
+            self._local = LRUCache(
+                getattr(settings, 'CATALOG_LOOKUP_CACHE_MAX_SIZE',
+                        DEFAULT_MAX_SIZE),
+                getattr(settings, 'CATALOG_LOOKUP_CACHE_TIMEOUT',
+                        DEFAULT_TIMEOUT))
+        return self._local
+
+    @property
+    def stats(self) -> LookupStats:
+        """The number of keys found in the caches and the database."""
+        return LookupStats(self._hits, self._misses)
+
+    def _shared_cache(self):
+        alias = getattr(settings, 'CATALOG_LOOKUP_SHARED_CACHE', None)
+        return caches[alias] if alias else None
+
+    def _shared_key(self, key: tuple) -> str:
+        # Names may hold characters that aren't valid in cache keys.
+        kind, value = key
+        return (f'catalog_lookup:{self.model._meta.label_lower}:{kind}:'
+                f'{hashlib.md5(str(value).encode()).hexdigest()}')
+
+    def _get_cached(self, keys: list[tuple]) -> dict:
+        values = self.local.get_many(keys)
+        missing_keys = [key for key in keys if key not in values]
+        shared_cache = self._shared_cache()
+        if missing_keys and shared_cache is not None:
+            shared_keys = {self._shared_key(key): key for key in missing_keys}
+            shared_values = {
+                shared_keys[shared_key]: value
+                for shared_key, value in shared_cache.get_many(
+                    shared_keys).items()}
+            self.local.set_many(shared_values)
+            values.update(shared_values)
+        with self._lock:
+            self._hits += len(values)
+            self._misses += len(keys) - len(values)
+        return values
+
+    def _set_cached(self, mapping: dict):
+        self.local.set_many(mapping)
+        shared_cache = self._shared_cache()
+        if shared_cache is not None:
+            shared_cache.set_many(
+                {self._shared_key(key): value
+                 for key, value in mapping.items()},
+                timeout=self.local.timeout)
+
+    def remember(self, name_ids: dict[str, int]):
+        """Cache name to id pairs once the current transaction commits."""
+        mapping = {}
+        for name, id_ in name_ids.items():
+            mapping['name', name] = id_
+            mapping['id', id_] = name
+        if mapping:
+            transaction.on_commit(lambda: self._set_cached(mapping))
+
+    def invalidate(self, id_: int, *names: str):
+        """Forget an id and names now and when the transaction commits.
+
+        Forgetting them now keeps the transaction from reading them back,
+        forgetting them again on commit drops what concurrent lookups
+        cached meanwhile from the not yet changed rows.
+        """
+        keys = [('id', id_), *(('name', name) for name in names)]
+
+        def delete_cached():
+            self.local.delete_many(keys)
+            shared_cache = self._shared_cache()
+            if shared_cache is not None:
+                shared_cache.delete_many(
+                    [self._shared_key(key) for key in keys])
+
+        delete_cached()
+        transaction.on_commit(delete_cached)
+
+    def get_ids(self, names: Iterable[str]) -> dict[str, int]:
+        """Get the ids of the given names that exist.
+
+        :param names: The names to look up.
+        :return: A name to id dict of the names found.
+        """
+        keys = [('name', name) for name in dict.fromkeys(names)]
+        name_ids = {name: id_ for (_, name), id_ in self._get_cached(
+            keys).items()}
+        missing_names = [name for _, name in keys if name not in name_ids]
+        if missing_names:
+            found_ids = dict(self.model.objects.filter(
+                name__in=missing_names).values_list('name', 'id'))
+            self.remember(found_ids)
+            name_ids.update(found_ids)
+        return name_ids
+
+    def get_by_ids(self, ids: Iterable[int]) -> dict[int, Model]:
+        """Get the objects of the given ids that exist.
+
+        The objects are built from the cached names, they're only meant for
+        display.
+
+        :param ids: The ids to look up.
+        :return: An id to object dict of the objects found.
+        """
+        keys = [('id', id_) for id_ in dict.fromkeys(ids)]
+        names = {id_: name for (_, id_), name in self._get_cached(
+            keys).items()}
+        missing_ids = [id_ for _, id_ in keys if id_ not in names]
+        if missing_ids:
+            found_names = dict(self.model.objects.filter(
+                id__in=missing_ids).values_list('id', 'name'))
+            self.remember({name: id_ for id_, name in found_names.items()})
+            names.update(found_names)
+        return {
+            id_: self.model.from_db(None, ['id', 'name'], (id_, name))
+            for id_, name in names.items()}
+
+    async def aget_by_ids(self, ids: Iterable[int]) -> dict[int, Model]:
+        """Async get_by_ids, only leaving the event loop on local misses."""
+        ids = list(dict.fromkeys(ids))
+        names = self.local.get_many(('id', id_) for id_ in ids)
+        if len(names) < len(ids):
+            return await sync_to_async(self.get_by_ids)(ids)
+        with self._lock:
+            self._hits += len(names)
+        return {
+            id_: self.model.from_db(None, ['id', 'name'], (id_, name))
+            for (_, id_), name in names.items()}
+
+    def clear(self):
+        """Forget the process local cache and statistics."""
+        # Rebuilt on next use, with the then current settings.
+        self._local = None
+        with self._lock:
+            self._hits = self._misses = 0
+
+
+categories_lookup = NameLookup(Categories)
+authors_lookup = NameLookup(Author)
+MODEL_LOOKUPS = {Categories: categories_lookup, Author: authors_lookup}
+
+
+def clear():
+    """Clear the process local caches of every lookup."""
+    categories_lookup.clear()
+    authors_lookup.clear()
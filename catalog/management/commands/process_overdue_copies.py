@@ -0,0 +1,46 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+
+from catalog import loans
+
+
+class Command(BaseCommand):
+    help = ('Mark the loans past their due date as overdue and make the '
+            'copies reserved past their reservation period available.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=loans.DEFAULT_BATCH_SIZE,
+            help='The number of copies processed per transaction.')
+        parser.add_argument(
+            '--date', type=datetime.date.fromisoformat,
+            help='The processing date (YYYY-MM-DD), defaults to today.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        batch_size = options['batch_size']
+        today = options['date']
+        overdue_count = self.process_chunks(
+            'Marked {} overdue loans',
+            loans.mark_overdue_copies(today, batch_size))
+        expired_count = self.process_chunks(
+            'Expired {} reservations',
+            loans.expire_reservations(today, batch_size))
+        self.stdout.write(self.style.SUCCESS(
+            f'Marked {overdue_count} overdue loans, '
+            f'expired {expired_count} reservations.'))
+
+    def process_chunks(self, message: str, chunks) -> int:
+        total_count = 0
+        start_time = time.perf_counter()
+        for chunk_number, count in enumerate(chunks, start=1):
+            end_time = time.perf_counter()
+            if self.verbosity >= 1:
+                self.stdout.write(
+                    f'Chunk {chunk_number}: {message.format(count)} in '
+                    f'{end_time - start_time:.3f}s.')
+            total_count += count
+            start_time = end_time
+        return total_count
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from catalog import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the catalog books full-text search index from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='The database whose search index to rebuild.')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if not search.is_supported(connection):
+            raise CommandError(
+                f'The {connection.vendor} database backend has no full-text '
+                'search index to rebuild.')
+        search.create_search_triggers(connection)
+        search.rebuild_search_index(connection)
+        self.stdout.write(self.style.SUCCESS('Rebuilt the search index.'))
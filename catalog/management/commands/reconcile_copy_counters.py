@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from catalog.models import Book
+
+
+class Command(BaseCommand):
+    help = ('Recompute the per-book copy counters from the book copies, '
+            'repairing drift left by bulk copy status updates.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='The number of books reconciled per transaction.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_book_id = 0
+        book_count = wrong_book_count = 0
+        while book_ids := list(
+                Book.objects.filter(id__gt=last_book_id).order_by(
+                    'id').values_list('id', flat=True)[:batch_size]):
+            with transaction.atomic():
+                wrong_book_count += Book.reconcile_copy_counters(book_ids)
+            book_count += len(book_ids)
+            last_book_id = book_ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled {book_count} books, '
+            f'{wrong_book_count} had wrong copy counters.'))
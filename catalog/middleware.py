@@ -0,0 +1,61 @@
+import asyncio
+
+from django.conf import settings
+
+from .routers import RequestRouting, request_routing
+
+REPLICA_PIN_COOKIE = 'replica_pin'
+DEFAULT_REPLICA_PIN_SECONDS = 5
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class ReplicaPinningMiddleware:
+    """Track the replica routing of every request (see catalog.routers).
+
+    A request made with a non safe method pins reads to the primary
+    database for its own duration and, through a short lived cookie, for
+    the client's requests of the next REPLICA_PIN_SECONDS.
+    """
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Mark the instance as a coroutine function, like Django's own
+            # MiddlewareMixin does.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = request_routing.set(self.start(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            request_routing.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        token = request_routing.set(self.start(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_routing.reset(token)
+        return self.finish(request, response)
+
+    @staticmethod
+    def start(request) -> RequestRouting:
+        return RequestRouting(
+            pinned=(request.method not in SAFE_METHODS
+                    or REPLICA_PIN_COOKIE in request.COOKIES))
+
+    @staticmethod
+    def finish(request, response):
+        if request.method not in SAFE_METHODS:
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1', httponly=True, samesite='Lax',
+                max_age=getattr(
+                    settings, 'REPLICA_PIN_SECONDS',
+                    DEFAULT_REPLICA_PIN_SECONDS))
+        return response
@@ -0,0 +1,43 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:54
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_isbns(apps, schema_editor):
+    """Merge books that would violate the new ISBN uniqueness.
+
+    Duplicate books are merged into their lowest id row, which takes over
+    their copies and authors.
+    """
+    Book = apps.get_model('catalog', 'Book')
+    BookCopy = apps.get_model('catalog', 'BookCopy')
+    BooksAuthors = apps.get_model('catalog', 'BooksAuthors')
+    duplicates = Book.objects.values('isbn').annotate(
+        kept_id=Min('id'), isbn_count=Count('id')).filter(isbn_count__gt=1)
+    for duplicate in duplicates:
+        merged_ids = list(Book.objects.filter(
+            isbn=duplicate['isbn']).exclude(
+            id=duplicate['kept_id']).values_list('id', flat=True))
+        BookCopy.objects.filter(book_id__in=merged_ids).update(
+            book_id=duplicate['kept_id'])
+        # Duplicate book-author pairs are reduced by the next migration.
+        BooksAuthors.objects.filter(book_id__in=merged_ids).update(
+            book_id=duplicate['kept_id'])
+        Book.objects.filter(id__in=merged_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_isbns, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='book',
+            name='isbn',
+            field=models.CharField(help_text='Enter the book\'s 13 digit ISBN.see <a href="https://www.isbn-international.org/content/what-isbn">ISBN number</a> for details.', max_length=13, unique=True, verbose_name='ISBN'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:55
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge rows that would violate the new uniqueness constraints.
+
+    Duplicate authors and categories are merged into their lowest id row
+    and duplicate book-author pairs are reduced to a single row.
+    """
+    Author = apps.get_model('catalog', 'Author')
+    Categories = apps.get_model('catalog', 'Categories')
+    Book = apps.get_model('catalog', 'Book')
+    BooksAuthors = apps.get_model('catalog', 'BooksAuthors')
+    for model, references in (
+            (Author, (BooksAuthors, 'author')),
+            (Categories, (Book, 'categories')),
+    ):
+        referencing_model, reference_name = references
+        duplicates = model.objects.values('name').annotate(
+            kept_id=Min('id'), name_count=Count('id')).filter(
+            name_count__gt=1)
+        for duplicate in duplicates:
+            merged_ids = model.objects.filter(
+                name=duplicate['name']).exclude(
+                id=duplicate['kept_id']).values_list('id', flat=True)
+            referencing_model.objects.filter(**{
+                f'{reference_name}_id__in': list(merged_ids)
+            }).update(**{f'{reference_name}_id': duplicate['kept_id']})
+            model.objects.filter(id__in=list(merged_ids)).delete()
+    duplicate_pairs = BooksAuthors.objects.values(
+        'book_id', 'author_id').annotate(
+        kept_id=Min('id'), pair_count=Count('id')).filter(pair_count__gt=1)
+    for duplicate_pair in duplicate_pairs:
+        BooksAuthors.objects.filter(
+            book_id=duplicate_pair['book_id'],
+            author_id=duplicate_pair['author_id'],
+        ).exclude(id=duplicate_pair['kept_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0002_alter_book_isbn'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
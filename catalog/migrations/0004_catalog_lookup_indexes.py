@@ -0,0 +1,37 @@
+# Generated by Django 4.1.6 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0003_merge_duplicate_names'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='author',
+            name='name',
+            field=models.CharField(help_text='Enter the name of the book author.', max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='publication_year',
+            field=models.PositiveSmallIntegerField(db_index=True, help_text="Enter the year of the book's publication."),
+        ),
+        migrations.AlterField(
+            model_name='book',
+            name='title',
+            field=models.CharField(db_index=True, help_text="Enter the book's title.", max_length=256),
+        ),
+        migrations.AlterField(
+            model_name='categories',
+            name='name',
+            field=models.CharField(help_text='Enter the name of the genre (e.g. fiction, historical, etc..).', max_length=64, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='booksauthors',
+            constraint=models.UniqueConstraint(fields=('book', 'author'), name='unique_book_author'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.1.6 on 2026-10-18 18:20
+
+from django.db import migrations
+
+AUTHORS_SQL = (
+    "SELECT group_concat(catalog_author.name, ', ')"
+    " FROM catalog_booksauthors"
+    " JOIN catalog_author"
+    " ON catalog_author.id = catalog_booksauthors.author_id"
+    " WHERE catalog_booksauthors.book_id = {book_id}"
+)
+TRIGGERS_SQL = {
+    'catalog_book_search_book_insert': (
+        "AFTER INSERT ON catalog_book BEGIN"
+        " INSERT INTO catalog_book_search"
+        "(rowid, title, subtitle, summary, authors)"
+        " VALUES (new.id, new.title, new.subtitle, new.summary,"
+        f" ({AUTHORS_SQL.format(book_id='new.id')}));"
+        " END"
+    ),
+    'catalog_book_search_book_update': (
+        "AFTER UPDATE OF title, subtitle, summary ON catalog_book BEGIN"
+        " UPDATE catalog_book_search"
+        " SET title = new.title, subtitle = new.subtitle,"
+        " summary = new.summary"
+        " WHERE rowid = new.id;"
+        " END"
+    ),
+    'catalog_book_search_book_delete': (
+        "AFTER DELETE ON catalog_book BEGIN"
+        " DELETE FROM catalog_book_search WHERE rowid = old.id;"
+        " END"
+    ),
+    'catalog_book_search_books_authors_insert': (
+        "AFTER INSERT ON catalog_booksauthors BEGIN"
+        " UPDATE catalog_book_search"
+        f" SET authors = ({AUTHORS_SQL.format(book_id='new.book_id')})"
+        " WHERE rowid = new.book_id;"
+        " END"
+    ),
+    'catalog_book_search_books_authors_delete': (
+        "AFTER DELETE ON catalog_booksauthors BEGIN"
+        " UPDATE catalog_book_search"
+        f" SET authors = ({AUTHORS_SQL.format(book_id='old.book_id')})"
+        " WHERE rowid = old.book_id;"
+        " END"
+    ),
+    'catalog_book_search_author_update': (
+        "AFTER UPDATE OF name ON catalog_author BEGIN"
+        " UPDATE catalog_book_search"
+        " SET authors = ("
+        f"{AUTHORS_SQL.format(book_id='catalog_book_search.rowid')})"
+        " WHERE rowid IN (SELECT book_id FROM catalog_booksauthors"
+        " WHERE author_id = new.id);"
+        " END"
+    ),
+}
+
+
+def create_search_index(apps, schema_editor):
+    # The FTS5 search index is SQLite only, see catalog.search.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS catalog_book_search"
+            " USING fts5(title, subtitle, summary, authors,"
+            " tokenize='unicode61 remove_diacritics 2')")
+        cursor.execute(
+            "INSERT INTO catalog_book_search(catalog_book_search, rank)"
+            " VALUES ('rank', 'bm25(10.0, 5.0, 1.0, 5.0)')")
+        for trigger_name, trigger_sql in TRIGGERS_SQL.items():
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {trigger_name} {trigger_sql}')
+        cursor.execute(
+            "INSERT INTO catalog_book_search"
+            "(rowid, title, subtitle, summary, authors)"
+            " SELECT id, title, subtitle, summary,"
+            f" ({AUTHORS_SQL.format(book_id='catalog_book.id')})"
+            " FROM catalog_book")
+        cursor.execute(
+            "INSERT INTO catalog_book_search(catalog_book_search)"
+            " VALUES ('optimize')")
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for trigger_name in TRIGGERS_SQL:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+        cursor.execute('DROP TABLE IF EXISTS catalog_book_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0004_catalog_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.1.6 on 2026-10-18 18:01
+
+from itertools import groupby
+
+from django.db import migrations, models
+
+AUTHORS_DISPLAY_MAX_LENGTH = 256
+
+
+def format_authors_display(author_names):
+    match author_names:
+        case []:
+            authors_string = ''
+        case [single_author]:
+            authors_string = single_author
+        case [*multiple_authors, last_author]:
+            authors_string = (', '.join(multiple_authors)
+                              + ' and ' + last_author)
+    return authors_string[:AUTHORS_DISPLAY_MAX_LENGTH]
+
+
+def populate_authors_display(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BooksAuthors = apps.get_model('catalog', 'BooksAuthors')
+    books_authors = BooksAuthors.objects.order_by(
+        'book_id', 'id').values_list('book_id', 'author__name').iterator(
+        chunk_size=2000)
+    books = []
+    for book_id, book_authors in groupby(
+            books_authors, key=lambda book_author: book_author[0]):
+        books.append(Book(
+            id=book_id,
+            authors_display=format_authors_display(
+                [author_name for _, author_name in book_authors])))
+        if len(books) >= 1000:
+            Book.objects.bulk_update(books, ['authors_display'])
+            books = []
+    Book.objects.bulk_update(books, ['authors_display'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0005_book_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='authors_display',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, help_text="The book's author names, denormalized from its authors so that displaying a book never queries them.", max_length=256),
+        ),
+        migrations.RunPython(
+            populate_authors_display, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.1.6 on 2026-10-18 18:03
+
+from django.db import migrations, models
+from django.db.models import Count
+
+COPY_COUNTERS = {
+    'A': 'copies_available',
+    'L': 'copies_on_loan',
+    'R': 'copies_reserved',
+    'M': 'copies_maintenance',
+}
+
+
+def count_copies(apps, schema_editor):
+    Book = apps.get_model('catalog', 'Book')
+    BookCopy = apps.get_model('catalog', 'BookCopy')
+    counters = {}
+    for copy_counts in BookCopy.objects.values('book_id', 'status').annotate(
+            copy_count=Count('id')).order_by():
+        counters.setdefault(copy_counts['book_id'], {})[
+            COPY_COUNTERS[copy_counts['status']]] = copy_counts['copy_count']
+    Book.objects.bulk_update(
+        [Book(id=book_id, **{
+            counter_name: book_counters.get(counter_name, 0)
+            for counter_name in COPY_COUNTERS.values()})
+         for book_id, book_counters in counters.items()],
+        list(COPY_COUNTERS.values()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0006_book_authors_display'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='copies_available',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="The number of the book's copies that are available."),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_maintenance',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="The number of the book's copies that are undergoing maintenance."),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_on_loan',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="The number of the book's copies that are on loan."),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='copies_reserved',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="The number of the book's copies that are reserved."),
+        ),
+        migrations.RunPython(count_copies, migrations.RunPython.noop),
+    ]
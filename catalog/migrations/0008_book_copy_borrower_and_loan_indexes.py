@@ -0,0 +1,29 @@
+# Generated by Django 4.1.6 on 2026-10-18 18:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('catalog', '0007_book_copy_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookcopy',
+            name='borrower',
+            field=models.ForeignKey(blank=True, help_text='Enter the library user currently borrowing or reserving the book, leave blank if the book is neither on loan nor reserved.', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='book_copies', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='bookcopy',
+            index=models.Index(fields=['status', 'due_back'], name='catalog_copy_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookcopy',
+            index=models.Index(fields=['book', 'status', 'due_back'], name='catalog_copy_book_status_idx'),
+        ),
+    ]
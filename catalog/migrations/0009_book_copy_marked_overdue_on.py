@@ -0,0 +1,18 @@
+# Generated by Django 4.1.6 on 2026-10-18 18:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('catalog', '0008_book_copy_borrower_and_loan_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookcopy',
+            name='marked_overdue_on',
+            field=models.DateField(blank=True, help_text="The date the loan was marked overdue by the process_overdue_copies command, blank if it wasn't.", null=True),
+        ),
+    ]
@@ -1,13 +1,18 @@
 import uuid
+from collections import defaultdict
+from typing import Iterable, Sequence
 
+from django.conf import settings
 from django.db import models
+from django.db.models import DEFERRED, Count, F
+from django.db.models.functions import Greatest
 from django.shortcuts import reverse
 
 
 class Author(models.Model):
     """A model representing a book Author."""
     name = models.CharField(
-        null=False, blank=False, max_length=64,
+        null=False, blank=False, max_length=64, unique=True,
         help_text='Enter the name of the book author.')
 
     def __str__(self):
@@ -19,7 +24,7 @@ class Categories(models.Model):
     """A model representing a book genre."""
     UNKNOWN = 'Unknown'
     name = models.CharField(
-        null=False, blank=False, max_length=64,
+        null=False, blank=False, max_length=64, unique=True,
         help_text='Enter the name of the genre '
                   '(e.g. fiction, historical, etc..).')
 
@@ -28,16 +33,35 @@ class Categories(models.Model):
         return self.name
 
 
+def format_authors_display(author_names: Sequence[str]) -> str:
+    """Join author names into a display string such as 'A, B and C'.
+
+    :param author_names: The author names in display order.
+    :return: The display string, empty if there are no authors, cut to the
+        length of Book.authors_display.
+    """
+    match author_names:
+        case []:
+            authors_string = ''
+        case [single_author]:
+            authors_string = single_author
+        case [*multiple_authors, last_author]:
+            authors_string = (', '.join(multiple_authors)
+                              + ' and ' + last_author)
+    return authors_string[:Book.AUTHORS_DISPLAY_MAX_LENGTH]
+
+
 class Book(models.Model):
     """A model representing the general information of a book."""
+    AUTHORS_DISPLAY_MAX_LENGTH = 256
     isbn = models.CharField(
-        'ISBN', max_length=13,
+        'ISBN', max_length=13, unique=True,
         help_text='Enter the book\'s 13 digit ISBN.'
                   'see <a href="'
                   'https://www.isbn-international.org/content/what-isbn'
                   '">ISBN number</a> for details.')
     title = models.CharField(
-        max_length=256, blank=False, null=False,
+        max_length=256, blank=False, null=False, db_index=True,
         help_text='Enter the book\'s title.')
     subtitle = models.CharField(
         max_length=256, blank=True, null=True,
@@ -46,8 +70,13 @@ class Book(models.Model):
     authors = models.ManyToManyField(
         Author, through='BooksAuthors',
         help_text='Choose the book\'s author/s.')
+    authors_display = models.CharField(
+        max_length=AUTHORS_DISPLAY_MAX_LENGTH, blank=True, null=False,
+        default='', editable=False, db_index=True,
+        help_text='The book\'s author names, denormalized from its authors '
+                  'so that displaying a book never queries them.')
     publication_year = models.PositiveSmallIntegerField(
-        blank=False, null=False,
+        blank=False, null=False, db_index=True,
         help_text='Enter the year of the book\'s publication.')
     categories = models.ForeignKey(
         Categories, on_delete=models.RESTRICT,
@@ -73,34 +102,88 @@ class Book(models.Model):
         blank=False, null=False, default=0,
         help_text='Enter a previously known count of user ratings,'
                   'can be left blank.')
+    # Copy counters by status, see BookCopy.COPY_COUNTERS.
+    copies_available = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text='The number of the book\'s copies that are available.')
+    copies_on_loan = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text='The number of the book\'s copies that are on loan.')
+    copies_reserved = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text='The number of the book\'s copies that are reserved.')
+    copies_maintenance = models.PositiveIntegerField(
+        default=0, editable=False,
+        help_text='The number of the book\'s copies that are undergoing '
+                  'maintenance.')
 
     class Meta:
         pass
         # ordering = ['title', 'authors', 'genre', 'ISBN', 'summary']
 
+    @property
+    def copies_total(self) -> int:
+        """The number of the book's copies, whatever their status."""
+        return (self.copies_available + self.copies_on_loan
+                + self.copies_reserved + self.copies_maintenance)
+
     def get_absolute_url(self):
         """Return the URL to access the general details of the book."""
         return reverse('book-detail', args=[str(self.id)])
 
     def __str__(self):
         """String representing the book's general information."""
-        return f'{self.title}'
-        # match self.authors:
-        #     case []:
-        #         authors_string = 'authors unknown'
-        #     case [single_author]:
-        #         authors_string = str(single_author)
-        #     case [author_1, author_2]:
-        #         authors_string = str(author_1) + ' and ' + str(author_2)
-        #     case [*multiple_authors]:
-        #         authors_string = ', '.join(
-        #             str(author) for author in multiple_authors[:-1])
-        #         authors_string = (authors_string + ' and '
-        #                           + str(multiple_authors[-1]))
-        #     case _:
-        #         raise Exception('Unexpected error while trying to generate '
-        #                         '__str__ for Book instance.')
-        # return f'{self.title} by {authors_string}'
+        return f'{self.title} by {self.authors_display or "authors unknown"}'
+
+    @classmethod
+    def refresh_authors_display(cls, book_ids: Iterable[int]):
+        """Recompute authors_display of the given books from BooksAuthors.
+
+        Authors are listed in the order they were added to each book.
+        """
+        book_ids = set(book_ids)
+        author_names = defaultdict(list)
+        for book_id, author_name in BooksAuthors.objects.filter(
+                book_id__in=book_ids).order_by('id').values_list(
+                'book_id', 'author__name'):
+            author_names[book_id].append(author_name)
+        cls.objects.bulk_update(
+            (cls(id=book_id,
+                 authors_display=format_authors_display(
+                     author_names[book_id]))
+             for book_id in book_ids),
+            ['authors_display'], batch_size=1000)
+
+    @classmethod
+    def reconcile_copy_counters(cls, book_ids: Iterable[int]) -> int:
+        """Recompute the copy counters of the given books from BookCopy.
+
+        The counters are maintained incrementally for saved and deleted
+        copies, this repairs them after bulk operations that bypass model
+        signals (e.g. QuerySet.update of BookCopy.status).
+
+        :param book_ids: The ids of the books to reconcile.
+        :return: The number of books whose counters were wrong.
+        """
+        book_ids = set(book_ids)
+        counters = {book_id: dict.fromkeys(
+            BookCopy.COPY_COUNTERS.values(), 0) for book_id in book_ids}
+        for copy_counts in BookCopy.objects.filter(
+                book_id__in=book_ids).values('book_id', 'status').annotate(
+                copy_count=Count('id')).order_by():
+            counter_name = BookCopy.COPY_COUNTERS[copy_counts['status']]
+            counters[copy_counts['book_id']][counter_name] = (
+                copy_counts['copy_count'])
+        wrong_books = []
+        for book_values in cls.objects.filter(id__in=book_ids).values(
+                'id', *BookCopy.COPY_COUNTERS.values()):
+            book_id = book_values.pop('id')
+            if book_values != counters[book_id]:
+                wrong_books.append(cls(id=book_id, **counters[book_id]))
+        cls.objects.bulk_update(
+            wrong_books, list(BookCopy.COPY_COUNTERS.values()),
+            batch_size=1000)
+        return len(wrong_books)
 
     def __repr__(self):
         return f'<{self.__class__.__name__}>: {self.title}'
@@ -115,6 +198,12 @@ class BooksAuthors(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     author = models.ForeignKey(Author, on_delete=models.RESTRICT)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['book', 'author'], name='unique_book_author'),
+        ]
+
 
 class BookCopy(models.Model):
     """A model representing a single loanable copy of a book."""
@@ -125,6 +214,14 @@ class BookCopy(models.Model):
         RESERVED = 'R'
         MAINTENANCE = 'M'
 
+    # The Book copy counter of each status.
+    COPY_COUNTERS = {
+        LoanStatus.AVAILABLE: 'copies_available',
+        LoanStatus.ON_LOAN: 'copies_on_loan',
+        LoanStatus.RESERVED: 'copies_reserved',
+        LoanStatus.MAINTENANCE: 'copies_maintenance',
+    }
+
     id = models.UUIDField(
         primary_key=True, default=uuid.uuid4,
         help_text='A unique id for the book copy across the whole library.')
@@ -140,36 +237,116 @@ class BookCopy(models.Model):
         max_length=1, null=False, blank=True,
         choices=LoanStatus.choices, default=LoanStatus.MAINTENANCE,
         help_text='Book Availability')
-    borrower = 'To be implemented'
-
-    # borrower = models.ForeignKey(
-    #     User, blank=True, null=True, on_delete=models.DO_NOTHING,
-    #     help_text='Enter the library user currently borrowing the book,'
-    #               ' leave blank if the book is not currently on loan.')
+    borrower = models.ForeignKey(
+        settings.AUTH_USER_MODEL, blank=True, null=True,
+        on_delete=models.PROTECT, related_name='book_copies',
+        help_text='Enter the library user currently borrowing or reserving '
+                  'the book, leave blank if the book is neither on loan nor '
+                  'reserved.')
+    marked_overdue_on = models.DateField(
+        blank=True, null=True,
+        help_text='The date the loan was marked overdue by the '
+                  'process_overdue_copies command, blank if it wasn\'t.')
 
     class Meta:
-        pass
         # ordering = ['id', 'book', 'imprint', 'status', 'due_back']
+        indexes = [
+            # Overdue loans and expired reservations, see catalog.loans.
+            models.Index(
+                fields=['status', 'due_back'],
+                name='catalog_copy_status_due_idx'),
+            # A book's available copies and its next copy due back.
+            models.Index(
+                fields=['book', 'status', 'due_back'],
+                name='catalog_copy_book_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        book_copy = super().from_db(db, field_names, values)
+        # Remember the counted state, see update_copy_counters. Deferred
+        # fields are loaded before a save or delete, see load_counted_state.
+        book_copy._counted = (
+            book_copy.__dict__.get('book_id', DEFERRED),
+            book_copy.__dict__.get('status', DEFERRED))
+        return book_copy
+
+    def load_counted_state(self):
+        """Load the counted state of fields deferred when the copy was loaded.
+
+        Must be called before the copy's row changes, the catalog's
+        pre_save and pre_delete receivers do.
+        """
+        if DEFERRED in getattr(self, '_counted', ()):
+            self._counted = BookCopy.objects.using(self._state.db).filter(
+                pk=self.pk).values_list('book_id', 'status').first() or (
+                None, None)
+
+    def update_copy_counters(self, deleted=False):
+        """Apply this copy's saved or deleted status to the book counters.
+
+        The counters are changed with F expressions, in a single UPDATE per
+        affected book, so concurrent status changes never lose counts.
+        Decrements stop at 0, so counters that drifted low after bulk
+        operations (see Book.reconcile_copy_counters) don't fail saves.
+
+        :param deleted: Set to True if the copy was deleted.
+        """
+        counted_book_id, counted_status = getattr(
+            self, '_counted', (None, None))
+        current = (None, None) if deleted else (self.book_id, self.status)
+        if current == (counted_book_id, counted_status):
+            return
+        counter_changes = defaultdict(dict)
+        if counted_book_id is not None:
+            counter_name = self.COPY_COUNTERS[counted_status]
+            counter_changes[counted_book_id][counter_name] = Greatest(
+                F(counter_name) - 1, 0)
+        if not deleted:
+            counter_name = self.COPY_COUNTERS[self.status]
+            counter_changes[self.book_id][counter_name] = (
+                F(counter_name) + 1)
+        for book_id, counter_updates in counter_changes.items():
+            Book.objects.filter(id=book_id).update(**counter_updates)
+        self._counted = current
 
     def get_absolute_url(self):
         """Return the URL for the book copy's details."""
         return reverse('book_copy-details', args=[str(self.id)])
 
+    def _related_display(self, field_name: str, fallback: str) -> str:
+        """Display a related object if it's already loaded, else fallback.
+
+        Rendering a copy never fetches its relations, so rendering a list
+        of copies doesn't cost a query per copy. select_related the
+        relations to display them.
+        """
+        if self._meta.get_field(field_name).is_cached(self):
+            return str(getattr(self, field_name))
+        return fallback
+
     def __str__(self):
         """ String representing the book copy's loan status and information."""
+        borrower = self._related_display(
+            'borrower', f'user #{self.borrower_id}')
         match self.status:
             case self.LoanStatus.AVAILABLE:
                 status = 'Available'
             case self.LoanStatus.ON_LOAN:
-                status = (f'On loan to {self.borrower!s},'
+                status = (f'On loan to {borrower},'
                           f' due back on {self.due_back!s}')
             case self.LoanStatus.RESERVED:
-                status = f'Reserved by {self.borrower!s}'
+                status = f'Reserved by {borrower}'
             case self.LoanStatus.MAINTENANCE:
-                status = (f'undergoing maintenance {self.borrower!s},'
+                status = ('Undergoing maintenance,'
                           f' due back on {self.due_back!s}')
             case _:
                 status = 'This status should never happen.'
-        return (
-            f'{self.book!s}. {status}.'
-        )
+        book = self._related_display('book', f'Book #{self.book_id}')
+        return f'{book}. {status}.'
+
+    def __repr__(self):
+        # Only the loaded fields, never deferred ones, nor relations.
+        return (f'<{self.__class__.__name__}>: {self.pk}'
+                f' status={self.__dict__.get("status")!r}'
+                f' book_id={self.__dict__.get("book_id")!r}')
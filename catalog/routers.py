@@ -0,0 +1,69 @@
+"""Route catalog browsing reads to read replicas.
+
+Reads of books, authors and categories made while serving a request go to
+a random alias of the DATABASE_REPLICAS setting. Everything else goes to
+the primary (default) database:
+
+* Writes, and every read of the request after its first write.
+* Reads inside a transaction on the primary.
+* Reads of the request following a write request (any non safe method)
+  for REPLICA_PIN_SECONDS, so that a redirect after a POST shows what was
+  written even if the replicas lag behind (see ReplicaPinningMiddleware).
+* Reads outside requests, e.g. by imports and management commands, which
+  read what they've just written.
+
+Routing is a no-op while DATABASE_REPLICAS is empty.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICATED_MODELS = frozenset({
+    'catalog.book', 'catalog.author', 'catalog.categories',
+    'catalog.booksauthors',
+})
+
+
+class RequestRouting:
+    """The replica routing state of the request being served."""
+
+    def __init__(self, pinned: bool):
+        self.pinned = pinned
+
+
+request_routing: ContextVar[RequestRouting | None] = ContextVar(
+    'request_routing', default=None)
+
+
+def _replicas() -> list[str]:
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = _replicas()
+        if not replicas:
+            return None
+        routing = request_routing.get()
+        if (routing is None or routing.pinned
+                or model._meta.label_lower not in REPLICATED_MODELS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if not _replicas():
+            return None
+        routing = request_routing.get()
+        if routing is not None:
+            routing.pinned = True
+        # Objects read from a replica are written to the primary too.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
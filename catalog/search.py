@@ -0,0 +1,258 @@
+"""Full-text search over the catalog's books.
+
+On SQLite the search is backed by an FTS5 virtual table holding each
+book's title, subtitle, summary and authors under the book's id. The
+table is kept in sync with Book, BooksAuthors and Author by SQLite
+triggers, so bulk operations that bypass model signals (the importer's
+bulk_create among them) are indexed too. The table and its BM25 column
+weights are created by migration 0005. Results are ranked by BM25 and come
+with a highlighted snippet of the best matching column.
+
+Other database vendors fall back to an unranked icontains search.
+"""
+import re
+from functools import reduce
+from operator import and_
+from typing import NamedTuple
+
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import SafeString, mark_safe
+
+from .models import Book
+
+SEARCH_TABLE = 'catalog_book_search'
+DEFAULT_PAGE_SIZE = 20
+SNIPPET_TOKENS = 16
+# Snippet highlight markers, replaced after escaping the snippet's html.
+_HIGHLIGHT_START, _HIGHLIGHT_END = '\x02', '\x03'
+
+_AUTHORS_SQL = (
+    "SELECT group_concat(catalog_author.name, ', ')"
+    " FROM catalog_booksauthors"
+    " JOIN catalog_author"
+    " ON catalog_author.id = catalog_booksauthors.author_id"
+    " WHERE catalog_booksauthors.book_id = {book_id}"
+)
+_TRIGGERS_SQL = {
+    'catalog_book_search_book_insert': (
+        "AFTER INSERT ON catalog_book BEGIN"
+        f" INSERT INTO {SEARCH_TABLE}"
+        "(rowid, title, subtitle, summary, authors)"
+        " VALUES (new.id, new.title, new.subtitle, new.summary,"
+        f" ({_AUTHORS_SQL.format(book_id='new.id')}));"
+        " END"
+    ),
+    'catalog_book_search_book_update': (
+        "AFTER UPDATE OF title, subtitle, summary ON catalog_book BEGIN"
+        f" UPDATE {SEARCH_TABLE}"
+        " SET title = new.title, subtitle = new.subtitle,"
+        " summary = new.summary"
+        " WHERE rowid = new.id;"
+        " END"
+    ),
+    'catalog_book_search_book_delete': (
+        "AFTER DELETE ON catalog_book BEGIN"
+        f" DELETE FROM {SEARCH_TABLE} WHERE rowid = old.id;"
+        " END"
+    ),
+    'catalog_book_search_books_authors_insert': (
+        "AFTER INSERT ON catalog_booksauthors BEGIN"
+        f" UPDATE {SEARCH_TABLE}"
+        f" SET authors = ({_AUTHORS_SQL.format(book_id='new.book_id')})"
+        " WHERE rowid = new.book_id;"
+        " END"
+    ),
+    'catalog_book_search_books_authors_delete': (
+        "AFTER DELETE ON catalog_booksauthors BEGIN"
+        f" UPDATE {SEARCH_TABLE}"
+        f" SET authors = ({_AUTHORS_SQL.format(book_id='old.book_id')})"
+        " WHERE rowid = old.book_id;"
+        " END"
+    ),
+    'catalog_book_search_author_update': (
+        "AFTER UPDATE OF name ON catalog_author BEGIN"
+        f" UPDATE {SEARCH_TABLE}"
+        " SET authors = ("
+        f"{_AUTHORS_SQL.format(book_id=f'{SEARCH_TABLE}.rowid')})"
+        " WHERE rowid IN (SELECT book_id FROM catalog_booksauthors"
+        " WHERE author_id = new.id);"
+        " END"
+    ),
+}
+_INDEX_BOOKS_SQL = (
+    f"INSERT INTO {SEARCH_TABLE}(rowid, title, subtitle, summary, authors)"
+    " SELECT id, title, subtitle, summary,"
+    f" ({_AUTHORS_SQL.format(book_id='catalog_book.id')})"
+    " FROM catalog_book"
+)
+_SEARCH_SQL = (
+    f"SELECT rowid, snippet({SEARCH_TABLE}, -1,"
+    f" char({ord(_HIGHLIGHT_START)}), char({ord(_HIGHLIGHT_END)}),"
+    f" '…', {SNIPPET_TOKENS})"
+    f" FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+    " ORDER BY rank LIMIT %s OFFSET %s"
+)
+
+_SEARCH_IDS_SQL = (
+    f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+    " ORDER BY rank LIMIT %s"
+)
+
+
+class SearchResult(NamedTuple):
+    book: Book
+    snippet: SafeString
+
+
+class SearchPage(NamedTuple):
+    results: list[SearchResult]
+    page: int
+    has_next: bool
+
+
+def is_supported(connection) -> bool:
+    """Check if connection's database supports the FTS5 search index."""
+    return connection.vendor == 'sqlite'
+
+
+def create_search_triggers(connection):
+    """Create any missing search index trigger.
+
+    SQLite drops a table's triggers along with the table, which Django's
+    SQLite schema editor does when it remakes a table to alter it, so this
+    is also run after every migrate (see MainConfig.ready).
+    """
+    with connection.cursor() as cursor:
+        for trigger_name, trigger_sql in _TRIGGERS_SQL.items():
+            cursor.execute(
+                f'CREATE TRIGGER IF NOT EXISTS {trigger_name} {trigger_sql}')
+
+
+def ensure_search_triggers(using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver recreating triggers dropped by migrations."""
+    connection = connections[using]
+    if (is_supported(connection)
+            and SEARCH_TABLE in connection.introspection.table_names()):
+        create_search_triggers(connection)
+
+
+def rebuild_search_index(connection):
+    """Re-index every book from scratch and optimize the index."""
+    with transaction.atomic(using=connection.alias), \
+            connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(_INDEX_BOOKS_SQL)
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def _search_terms(query: str) -> list[str]:
+    return re.findall(r'\w+', query)
+
+
+def _match_expression(search_terms: list[str]) -> str:
+    # Quote every term so user input can never be parsed as FTS5 query
+    # syntax, and prefix match the last term for search-as-you-type.
+    return ' '.join(f'"{search_term}"' for search_term in search_terms) + '*'
+
+
+def _render_snippet(snippet: str) -> SafeString:
+    return mark_safe(
+        escape(snippet)
+        .replace(_HIGHLIGHT_START, '<mark>')
+        .replace(_HIGHLIGHT_END, '</mark>'))
+
+
+def _fallback_filter(search_terms: list[str]) -> Q:
+    return reduce(and_, (
+        Q(title__icontains=search_term)
+        | Q(subtitle__icontains=search_term)
+        | Q(summary__icontains=search_term)
+        | Q(authors__name__icontains=search_term)
+        for search_term in search_terms
+    ))
+
+
+def _search_books_fallback(
+        search_terms: list[str], page: int, page_size: int, using: str
+) -> SearchPage:
+    offset = (page - 1) * page_size
+    books = list(
+        Book.objects.using(using).select_related('categories').filter(
+            _fallback_filter(search_terms)).distinct().order_by(
+            'title', 'id')[offset:offset + page_size + 1])
+    return SearchPage(
+        results=[
+            SearchResult(book, escape(book.summary or ''))
+            for book in books[:page_size]],
+        page=page,
+        has_next=len(books) > page_size,
+    )
+
+
+def search_books(
+        query: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE,
+        using: str = DEFAULT_DB_ALIAS
+) -> SearchPage:
+    """Search the catalog's books.
+
+    Every word of query has to match the book's title, subtitle, summary
+    or authors, the last word may also match as a prefix.
+
+    :param query: The user's search query.
+    :param page: The 1 based number of the results page to get.
+    :param page_size: The number of results per page.
+    :param using: The alias of the database to search.
+    :return: The requested SearchPage, best matches first.
+    """
+    search_terms = _search_terms(query)
+    if not search_terms:
+        return SearchPage(results=[], page=page, has_next=False)
+    connection = connections[using]
+    if not is_supported(connection):
+        return _search_books_fallback(search_terms, page, page_size, using)
+    with connection.cursor() as cursor:
+        cursor.execute(_SEARCH_SQL, [
+            _match_expression(search_terms),
+            page_size + 1,
+            (page - 1) * page_size,
+        ])
+        rows = cursor.fetchall()
+    books = Book.objects.using(using).select_related('categories').in_bulk(
+        [book_id for book_id, _ in rows[:page_size]])
+    return SearchPage(
+        results=[
+            SearchResult(books[book_id], _render_snippet(snippet))
+            for book_id, snippet in rows[:page_size]
+            if book_id in books],
+        page=page,
+        has_next=len(rows) > page_size,
+    )
+
+
+def search_book_ids(
+        query: str, limit: int, using: str = DEFAULT_DB_ALIAS) -> list[int]:
+    """Get the ids of the books best matching a search query.
+
+    Matches like search_books, without loading the books.
+
+    :param query: The user's search query.
+    :param limit: The maximal number of ids to get.
+    :param using: The alias of the database to search.
+    :return: The ids of up to limit matching books.
+    """
+    search_terms = _search_terms(query)
+    if not search_terms:
+        return []
+    connection = connections[using]
+    if not is_supported(connection):
+        return list(
+            Book.objects.using(using).filter(
+                _fallback_filter(search_terms)).distinct().order_by(
+                'title', 'id').values_list('id', flat=True)[:limit])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _SEARCH_IDS_SQL, [_match_expression(search_terms), limit])
+        return [book_id for book_id, in cursor.fetchall()]
@@ -0,0 +1,121 @@
+"""Signal receivers keeping Book's denormalized columns in sync.
+
+Book.authors_display follows the book's authors and the Book copy
+counters follow the status of the book's copies. Bulk operations that
+send no signals (bulk_create, bulk_update, update) have to call
+Book.refresh_authors_display or Book.reconcile_copy_counters themselves,
+as the importer does for the former. Bulk deletes of BooksAuthors can
+skip the per row refresh with authors_display_refresh_skipped.
+
+The cached category and author lookups (see catalog.lookups) forget the
+saved and deleted categories and authors.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import QuerySet
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .lookups import MODEL_LOOKUPS
+from .models import Author, Book, BookCopy, BooksAuthors, Categories
+
+_skip_authors_display_refresh = ContextVar(
+    'skip_authors_display_refresh', default=False)
+
+
+@contextmanager
+def authors_display_refresh_skipped():
+    """Skip refreshing authors_display when BooksAuthors are deleted.
+
+    For bulk writers that call Book.refresh_authors_display themselves.
+    """
+    token = _skip_authors_display_refresh.set(True)
+    try:
+        yield
+    finally:
+        _skip_authors_display_refresh.reset(token)
+
+
+@receiver(post_save, sender=BooksAuthors)
+def refresh_on_books_authors_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        Book.refresh_authors_display([instance.book_id])
+
+
+@receiver(post_delete, sender=BooksAuthors)
+def refresh_on_books_authors_delete(sender, instance, origin=None, **kwargs):
+    if _skip_authors_display_refresh.get():
+        return
+    # Skip relations deleted along with their book.
+    if isinstance(origin, Book) or (
+            isinstance(origin, QuerySet) and origin.model is Book):
+        return
+    Book.refresh_authors_display([instance.book_id])
+
+
+@receiver(m2m_changed, sender=Book.authors.through)
+def refresh_on_authors_changed(
+        sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Book.refresh_authors_display([instance.pk])
+    elif action == 'pre_clear':
+        # post_clear doesn't tell which books lost the author.
+        instance._cleared_book_ids = list(
+            BooksAuthors.objects.filter(author_id=instance.pk).values_list(
+                'book_id', flat=True))
+    elif action == 'post_clear':
+        Book.refresh_authors_display(instance._cleared_book_ids)
+    elif action in ('post_add', 'post_remove'):
+        Book.refresh_authors_display(pk_set)
+
+
+@receiver(post_save, sender=Author)
+def refresh_on_author_rename(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        Book.refresh_authors_display(
+            BooksAuthors.objects.filter(author_id=instance.pk).values_list(
+                'book_id', flat=True))
+
+
+@receiver(pre_save, sender=BookCopy)
+@receiver(pre_delete, sender=BookCopy)
+def load_counted_state_on_copy_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.load_counted_state()
+
+
+@receiver(post_save, sender=BookCopy)
+def update_counters_on_copy_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        instance.update_copy_counters()
+
+
+@receiver(post_delete, sender=BookCopy)
+def update_counters_on_copy_delete(sender, instance, **kwargs):
+    instance.update_copy_counters(deleted=True)
+
+
+@receiver(pre_save, sender=Author)
+@receiver(pre_save, sender=Categories)
+def remember_name_before_save(sender, instance, raw=False, **kwargs):
+    # A renamed object's lookups by its previous name have to be forgotten.
+    if not raw and instance.pk is not None:
+        instance._name_before_save = sender.objects.filter(
+            pk=instance.pk).values_list('name', flat=True).first()
+
+
+@receiver(post_save, sender=Author)
+@receiver(post_save, sender=Categories)
+def invalidate_lookups_on_save(sender, instance, **kwargs):
+    names = {instance.name, getattr(instance, '_name_before_save', None)}
+    names.discard(None)
+    MODEL_LOOKUPS[sender].invalidate(instance.pk, *names)
+
+
+@receiver(post_delete, sender=Author)
+@receiver(post_delete, sender=Categories)
+def invalidate_lookups_on_delete(sender, instance, **kwargs):
+    MODEL_LOOKUPS[sender].invalidate(instance.pk, instance.name)
@@ -1,3 +1,1258 @@
-from django.test import TestCase
+# -*- coding: utf-8 -*-
 
-# Create your tests here.
+"""This is the main tests file for the catalog app.
+
+"""
+
+# ====================IMPORTS=======================================
+import csv
+import datetime
+import io
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from . import admin as catalog_admin, loans, lookups
+from .middleware import REPLICA_PIN_COOKIE
+from .models import (
+    Author, Book, BookCopy, BooksAuthors, Categories, format_authors_display)
+from .routers import ReplicaRouter, RequestRouting, request_routing
+from .search import search_books
+from .utils import data_import
+
+
+# ====================TESTING UTILITIES===============================
+DATASET_FIELD_NAMES = (
+    'isbn13', 'isbn10', 'title', 'subtitle', 'authors', 'categories',
+    'thumbnail', 'description', 'published_year', 'average_rating',
+    'num_pages', 'ratings_count',
+)
+
+
+def dataset_row(isbn13: str, title: str = "Ipsum lorem", **fields) -> dict:
+    """
+    Create a 7k books dataset style csv row.
+
+    :param isbn13: The value for the row's isbn13 column.
+    :param title: The value for the row's title column.
+    :param fields: Values for any other dataset column.
+    :return: A dict with a value for every dataset column.
+    """
+    row = {
+        'isbn13': isbn13, 'isbn10': '', 'title': title, 'subtitle': '',
+        'authors': 'Author A', 'categories': 'Fiction', 'thumbnail': '',
+        'description': 'Ipsum lorem.', 'published_year': '2000',
+        'average_rating': '3.50', 'num_pages': '100', 'ratings_count': '10',
+    }
+    row.update(fields)
+    return row
+
+
+def write_dataset_csv(directory: Path, rows: list[dict]) -> Path:
+    """
+    Write dataset rows to a csv file in directory.
+
+    :param directory: The directory in which to create the csv file.
+    :param rows: The dataset rows to write.
+    :return: The path of the new csv file.
+    """
+    csv_file = directory / 'books.csv'
+    with open(csv_file, 'w', newline='') as csv_io:
+        csv_writer = csv.DictWriter(csv_io, fieldnames=DATASET_FIELD_NAMES)
+        csv_writer.writeheader()
+        csv_writer.writerows(rows)
+    return csv_file
+
+
+# ====================DATA IMPORT TESTS=============================
+class ImportBooksFromCsvTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+
+    def test_import_creates_books_and_relations(self):
+        """
+        Test that every csv row is imported with its category and authors,
+        and that shared names are only created once.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row('1', authors='Author A;Author B'),
+            dataset_row('2', authors='Author B', categories=''),
+            dataset_row('3', authors='Author A; Author A'),
+        ])
+        book_count = data_import.import_books_from_csv(csv_file, batch_size=2)
+        self.assertEqual(book_count, 3)
+        self.assertEqual(Book.objects.count(), 3)
+        self.assertQuerysetEqual(
+            Author.objects.order_by('name').values_list('name', flat=True),
+            ['Author A', 'Author B'])
+        self.assertQuerysetEqual(
+            Categories.objects.order_by('name').values_list(
+                'name', flat=True),
+            ['Fiction', Categories.UNKNOWN])
+        self.assertQuerysetEqual(
+            Book.objects.get(isbn='1').authors.order_by('name').values_list(
+                'name', flat=True),
+            ['Author A', 'Author B'])
+        self.assertEqual(BooksAuthors.objects.count(), 4)
+
+    def test_import_tolerates_missing_numeric_values(self):
+        """
+        Test that empty numeric columns fall back to the Book defaults
+        instead of failing the import.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row('1', published_year='', average_rating='',
+                        num_pages='', ratings_count=''),
+        ])
+        data_import.import_books_from_csv(csv_file)
+        book = Book.objects.get(isbn='1')
+        self.assertEqual(book.publication_year, 0)
+        self.assertEqual(book.page_count, 0)
+        self.assertEqual(book.average_rating, Decimal(5))
+        self.assertEqual(book.ratings_count, 0)
+
+    def test_import_reuses_existing_names(self):
+        """
+        Test that categories and authors already in the database are
+        reused rather than duplicated.
+        """
+        author = Author.objects.create(name='Author A')
+        category = Categories.objects.create(name='Fiction')
+        csv_file = write_dataset_csv(self.temp_dir, [dataset_row('1')])
+        data_import.import_books_from_csv(csv_file)
+        book = Book.objects.get(isbn='1')
+        self.assertEqual(book.categories, category)
+        self.assertQuerysetEqual(book.authors.all(), [author])
+        self.assertEqual(Author.objects.count(), 1)
+
+    def test_import_keeps_multiline_fields(self):
+        """
+        Test that quoted fields spanning several lines are read as a single
+        row.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row('1', description='Ipsum\nlorem.'),
+            dataset_row('2'),
+        ])
+        data_import.import_books_from_csv(csv_file)
+        self.assertEqual(Book.objects.get(isbn='1').summary, 'Ipsum\nlorem.')
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_checkpointed_import_resumes_after_failure(self):
+        """
+        Test that a checkpointed import commits every batch and that a
+        failed import resumes from the last committed batch.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row(str(isbn)) for isbn in range(5)])
+        checkpoint_file = self.temp_dir / 'import.checkpoint'
+        write_books_batch = data_import._write_books_batch
+
+        def fail_on_third_batch(book_records, *args):
+            if book_records[0].fields['isbn'] == '4':
+                raise RuntimeError('Simulated crash.')
+            write_books_batch(book_records, *args)
+
+        with mock.patch.object(
+                data_import, '_write_books_batch', fail_on_third_batch):
+            with self.assertRaises(RuntimeError):
+                data_import.import_books_from_csv(
+                    csv_file, batch_size=2, checkpoint_file=checkpoint_file)
+        self.assertEqual(Book.objects.count(), 4)
+        self.assertTrue(checkpoint_file.exists())
+        book_count = data_import.import_books_from_csv(
+            csv_file, batch_size=2, checkpoint_file=checkpoint_file)
+        self.assertEqual(book_count, 5)
+        self.assertQuerysetEqual(
+            Book.objects.order_by('isbn').values_list('isbn', flat=True),
+            ['0', '1', '2', '3', '4'])
+        self.assertFalse(checkpoint_file.exists())
+
+    def test_checkpointed_import_resumes_after_unrecorded_batch(self):
+        """
+        Test that an import that crashed between committing a batch and
+        recording it in the checkpoint resumes without failing on that
+        batch's books.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row(str(isbn)) for isbn in range(5)])
+        checkpoint_file = self.temp_dir / 'import.checkpoint'
+        write_checkpoint = data_import._write_checkpoint
+
+        def crash_on_second_checkpoint(checkpoint_file, checkpoint):
+            if checkpoint['book_count'] == 4:
+                raise RuntimeError('Simulated crash.')
+            write_checkpoint(checkpoint_file, checkpoint)
+
+        with mock.patch.object(
+                data_import, '_write_checkpoint', crash_on_second_checkpoint):
+            with self.assertRaises(RuntimeError):
+                data_import.import_books_from_csv(
+                    csv_file, batch_size=2, checkpoint_file=checkpoint_file)
+        self.assertEqual(Book.objects.count(), 4)
+        book_count = data_import.import_books_from_csv(
+            csv_file, batch_size=2, checkpoint_file=checkpoint_file)
+        self.assertEqual(book_count, 5)
+        self.assertQuerysetEqual(
+            Book.objects.order_by('isbn').values_list('isbn', flat=True),
+            ['0', '1', '2', '3', '4'])
+
+    def test_checkpointed_import_resumes_after_unrecorded_first_batch(self):
+        """
+        Test that an import that crashed between committing its first batch
+        and writing its first checkpoint resumes without failing on that
+        batch's books.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row(str(isbn)) for isbn in range(5)])
+        checkpoint_file = self.temp_dir / 'import.checkpoint'
+
+        with mock.patch.object(
+                data_import, '_write_checkpoint',
+                side_effect=RuntimeError('Simulated crash.')):
+            with self.assertRaises(RuntimeError):
+                data_import.import_books_from_csv(
+                    csv_file, batch_size=2, checkpoint_file=checkpoint_file)
+        self.assertEqual(Book.objects.count(), 2)
+        self.assertFalse(checkpoint_file.exists())
+        book_count = data_import.import_books_from_csv(
+            csv_file, batch_size=2, checkpoint_file=checkpoint_file)
+        self.assertEqual(book_count, 5)
+        self.assertQuerysetEqual(
+            Book.objects.order_by('isbn').values_list('isbn', flat=True),
+            ['0', '1', '2', '3', '4'])
+
+    def test_parallel_parsing_matches_serial_parsing(self):
+        """
+        Test that parsing byte ranges in worker processes yields the same
+        records and offsets as serial parsing, multiline fields included.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row(str(isbn), description='Ipsum "lorem"\n' * isbn)
+            for isbn in range(20)])
+        serial_records = list(data_import.read_book_records(csv_file))
+        parallel_records = list(data_import.read_book_records_parallel(
+            csv_file, max_workers=2, range_size=64))
+        self.assertEqual(parallel_records, serial_records)
+        resumed_records = list(data_import.read_book_records_parallel(
+            csv_file, offset=serial_records[9][1], max_workers=2,
+            range_size=64))
+        self.assertEqual(resumed_records, serial_records[10:])
+
+    def test_import_with_parse_workers(self):
+        """
+        Test that an import with parse workers writes every book.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row(str(isbn)) for isbn in range(10)])
+        book_count = data_import.import_books_from_csv(
+            csv_file, batch_size=3, parse_workers=2)
+        self.assertEqual(book_count, 10)
+        self.assertEqual(Book.objects.count(), 10)
+
+
+class SyncBooksFromCsvTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.temp_dir = Path(temp_dir.name)
+        data_import.import_books_from_csv(write_dataset_csv(self.temp_dir, [
+            dataset_row('1'), dataset_row('2'), dataset_row('3'),
+        ]))
+
+    def test_sync_of_unchanged_csv_writes_nothing(self):
+        """
+        Test that syncing an unchanged csv only diffs the books, without
+        any insert, update or delete query.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row('1'), dataset_row('2'), dataset_row('3'),
+        ])
+        with CaptureQueriesContext(connection) as captured_queries:
+            sync_stats = data_import.sync_books_from_csv(csv_file)
+        self.assertEqual(sync_stats, data_import.SyncStats(unchanged=3))
+        statements = {
+            query['sql'].split()[0] for query in captured_queries}
+        self.assertFalse(statements & {'INSERT', 'UPDATE', 'DELETE'})
+
+    def test_sync_creates_updates_and_deletes(self):
+        """
+        Test that syncing creates new books, updates changed books and
+        their authors, and deletes vanished books without copies only.
+        """
+        book_3 = Book.objects.get(isbn='3')
+        BookCopy.objects.create(book=book_3)
+        book_2_id = Book.objects.get(isbn='2').id
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row('1', title='New title'),
+            dataset_row('4', authors='Author B'),
+        ])
+        sync_stats = data_import.sync_books_from_csv(
+            csv_file, delete_missing=True)
+        self.assertEqual(
+            sync_stats, data_import.SyncStats(created=1, updated=1, deleted=1))
+        self.assertEqual(Book.objects.get(isbn='1').title, 'New title')
+        self.assertFalse(Book.objects.filter(id=book_2_id).exists())
+        self.assertTrue(Book.objects.filter(id=book_3.id).exists())
+        self.assertQuerysetEqual(
+            Book.objects.get(isbn='4').authors.values_list('name', flat=True),
+            ['Author B'])
+
+    def test_sync_replaces_changed_authors(self):
+        """
+        Test that a change in a book's authors alone is synced.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row('1', authors='Author B;Author C'),
+        ])
+        sync_stats = data_import.sync_books_from_csv(csv_file)
+        self.assertEqual(sync_stats, data_import.SyncStats(updated=1))
+        self.assertQuerysetEqual(
+            Book.objects.get(isbn='1').authors.order_by('name').values_list(
+                'name', flat=True),
+            ['Author B', 'Author C'])
+
+    def test_sync_replaces_authors_in_bulk(self):
+        """
+        Test that replacing the authors of many books costs a fixed number
+        of write queries.
+        """
+        csv_file = write_dataset_csv(self.temp_dir, [
+            dataset_row(isbn, authors=f'Author {isbn}') for isbn in '123'
+        ])
+        with CaptureQueriesContext(connection) as captured_queries:
+            sync_stats = data_import.sync_books_from_csv(csv_file)
+        self.assertEqual(sync_stats, data_import.SyncStats(updated=3))
+        statements = Counter(
+            query['sql'].split()[0] for query in captured_queries)
+        self.assertEqual(
+            (statements['INSERT'], statements['UPDATE'],
+             statements['DELETE']),
+            # Authors, books authors; books; books authors.
+            (2, 1, 1))
+        self.assertEqual(
+            Book.objects.get(isbn='2').authors_display, 'Author 2')
+
+
+class NameIdsTests(TestCase):
+    def test_resolve_is_bounded_and_falls_back_to_the_database(self):
+        """
+        Test that evicted names are found in the database instead of being
+        created again.
+        """
+        author_ids = data_import.NameIds(Author, max_size=1)
+        first_ids = author_ids.resolve(['Author A', 'Author B'])
+        self.assertEqual(len(author_ids._ids), 1)
+        self.assertEqual(author_ids.resolve(['Author A']), {
+            'Author A': first_ids['Author A']})
+        self.assertEqual(Author.objects.count(), 2)
+
+
+class LookupsTests(TestCase):
+    def setUp(self):
+        self.addCleanup(lookups.clear)
+        self.category = Categories.objects.create(name='Fiction')
+
+    def test_lru_cache_is_bounded_and_expires(self):
+        """
+        Test that the least recently used entries are evicted and that
+        entries expire after the timeout.
+        """
+        lru_cache = lookups.LRUCache(max_size=2, timeout=10)
+        with mock.patch.object(lookups.time, 'monotonic', return_value=0):
+            lru_cache.set_many({'a': 1, 'b': 2})
+            lru_cache.get_many(['a'])
+            lru_cache.set_many({'c': 3})
+            self.assertEqual(lru_cache.get_many('abc'), {'a': 1, 'c': 3})
+        with mock.patch.object(lookups.time, 'monotonic', return_value=10):
+            self.assertEqual(lru_cache.get_many('abc'), {})
+        self.assertEqual(len(lru_cache), 0)
+
+    def test_lookups_are_cached(self):
+        """
+        Test that names and ids are looked up in the database once.
+        """
+        lookup = lookups.categories_lookup
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(
+                lookup.get_ids(['Fiction', 'Missing']),
+                {'Fiction': self.category.id})
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                lookup.get_ids(['Fiction']), {'Fiction': self.category.id})
+            self.assertEqual(
+                lookup.get_by_ids([self.category.id])[
+                    self.category.id].name,
+                'Fiction')
+        self.assertEqual(lookup.stats, lookups.LookupStats(hits=2, misses=2))
+
+    def test_lookups_are_cached_after_commit(self):
+        """
+        Test that lookups inside a transaction are only cached once it
+        commits.
+        """
+        lookups.categories_lookup.get_ids(['Fiction'])
+        with self.assertNumQueries(1):
+            lookups.categories_lookup.get_ids(['Fiction'])
+
+    def test_save_and_delete_invalidate(self):
+        """
+        Test that renamed and deleted objects are looked up again.
+        """
+        lookup = lookups.categories_lookup
+        with self.captureOnCommitCallbacks(execute=True):
+            lookup.get_ids(['Fiction'])
+            self.category.name = 'Fantasy'
+            self.category.save()
+        self.assertEqual(lookup.get_ids(['Fiction']), {})
+        self.assertEqual(
+            lookup.get_by_ids([self.category.id])[self.category.id].name,
+            'Fantasy')
+        with self.captureOnCommitCallbacks(execute=True):
+            lookup.get_ids(['Fantasy'])
+            self.category.delete()
+        self.assertEqual(lookup.get_ids(['Fantasy']), {})
+
+    @override_settings(CATALOG_LOOKUP_SHARED_CACHE='default')
+    def test_shared_cache(self):
+        """
+        Test that lookups cached by another process (the shared cache) don't
+        query the database.
+        """
+        self.addCleanup(caches['default'].clear)
+        with self.captureOnCommitCallbacks(execute=True):
+            lookups.categories_lookup.get_ids(['Fiction'])
+        lookups.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                lookups.categories_lookup.get_ids(['Fiction']),
+                {'Fiction': self.category.id})
+
+    def test_reimport_in_one_process(self):
+        """
+        Test that importing the 7k books again in the same process doesn't
+        write the ids of the categories and authors it deleted, which the
+        first import's lookups cached.
+        """
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        csv_file = write_dataset_csv(Path(temp_dir.name), [
+            dataset_row(str(isbn), authors=f'Author {isbn}')
+            for isbn in range(3)])
+        with mock.patch.object(data_import, 'DATASET_7K_BOOKS', csv_file):
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    data_import.import_7k_books()
+                    # Warm the lookups the way the views do.
+                    lookups.categories_lookup.get_by_ids(
+                        Book.objects.values_list('categories_id', flat=True))
+        connection.check_constraints()
+        self.assertEqual(
+            Book.objects.filter(
+                categories__name='Fiction',
+                authors__name__startswith='Author ').count(),
+            3)
+
+
+# ====================SEARCH TESTS==================================
+class SearchBooksTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        data_import.import_books_from_csv(write_dataset_csv(
+            Path(temp_dir.name), [
+                dataset_row('1', title='The Hobbit',
+                            authors='J. R. R. Tolkien',
+                            description='A hobbit goes <there> and back.'),
+                dataset_row('2', title='Dune', authors='Frank Herbert',
+                            description='Spice and sand worms.'),
+                dataset_row('3', title='Hobbit Companion',
+                            authors='David Day'),
+            ]))
+
+    def search_isbns(self, query: str, **kwargs) -> list[str]:
+        return [
+            search_result.book.isbn
+            for search_result in search_books(query, **kwargs).results]
+
+    def test_search_ranks_title_matches_first(self):
+        """
+        Test that bulk imported books are indexed and that title matches
+        rank above summary matches.
+        """
+        self.assertEqual(self.search_isbns('hobbit'), ['3', '1'])
+        self.assertEqual(self.search_isbns('tolkien'), ['1'])
+        self.assertEqual(self.search_isbns('sand wor'), ['2'])
+
+    def test_search_index_follows_changes(self):
+        """
+        Test that book updates, author renames and deletions are reflected
+        in the search index.
+        """
+        Book.objects.filter(isbn='2').update(title='Arrakis')
+        self.assertEqual(self.search_isbns('arrakis'), ['2'])
+        Author.objects.filter(name='Frank Herbert').update(name='F. Herbert')
+        self.assertEqual(self.search_isbns('herbert'), ['2'])
+        self.assertEqual(self.search_isbns('frank'), [])
+        Book.objects.filter(isbn='2').delete()
+        self.assertEqual(self.search_isbns('arrakis'), [])
+
+    def test_search_pagination_and_snippets(self):
+        """
+        Test that results are paginated and that snippets are escaped and
+        highlighted.
+        """
+        search_page = search_books('hobbit', page_size=1)
+        self.assertTrue(search_page.has_next)
+        search_page = search_books('hobbit', page=2, page_size=1)
+        self.assertFalse(search_page.has_next)
+        snippet = search_books('back').results[0].snippet
+        self.assertIn('&lt;there&gt;', snippet)
+        self.assertIn('<mark>back</mark>', snippet)
+
+    def test_search_query_syntax_is_not_interpreted(self):
+        """
+        Test that FTS5 query syntax in user input doesn't raise.
+        """
+        self.assertEqual(self.search_isbns('"dune OR ( NEAR'), [])
+        self.assertEqual(self.search_isbns('  '), [])
+
+    def test_rebuild_search_index_command(self):
+        """
+        Test that the rebuild command restores an emptied index.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM catalog_book_search')
+        call_command('rebuild_search_index', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.search_isbns('dune'), ['2'])
+
+    def test_search_view(self):
+        """
+        Test that the search page lists the matching books.
+        """
+        response = self.client.get(reverse('book-search'), {'q': 'dune'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Dune')
+        self.assertNotContains(response, 'The Hobbit')
+
+
+# ====================VIEWS TESTS===================================
+class BookViewsTests(TestCase):
+    def setUp(self):
+        self.addCleanup(lookups.clear)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        # Titles repeat so that pages also split between equal titles.
+        data_import.import_books_from_csv(write_dataset_csv(
+            Path(temp_dir.name), [
+                dataset_row(str(isbn), title=f'Title {isbn // 2:02}',
+                            authors=f'Author {isbn};Author {isbn + 1}')
+                for isbn in range(45)
+            ]))
+
+    def get_book_list(self, **params):
+        response = self.client.get(reverse('books'), params)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_book_list_query_count(self):
+        """
+        Test that a book list page costs a fixed number of queries,
+        whatever the number of books and authors on it.
+        """
+        first_book = Book.objects.order_by('title', 'id').first()
+        for status in 'AAML':
+            BookCopy.objects.create(book=first_book, status=status)
+        with self.assertNumQueries(2), \
+                self.captureOnCommitCallbacks(execute=True):
+            # books, uncached categories.
+            self.get_book_list()
+        with self.assertNumQueries(1):
+            # books, the categories are cached.
+            response = self.get_book_list()
+        self.assertEqual(len(response.context['book_list']), 20)
+        self.assertContains(response, '2 of 4 copies available')
+        self.assertContains(response, 'Author 0 and Author 1')
+
+    def test_book_list_keyset_pagination(self):
+        """
+        Test that following the next and previous links walks every book
+        exactly once in order.
+        """
+        pages = []
+        response = self.get_book_list()
+        while True:
+            pages.append([book.isbn for book in response.context['book_list']])
+            if not response.context['next_cursor']:
+                break
+            response = self.get_book_list(
+                after=response.context['next_cursor'])
+        self.assertEqual(
+            [isbn for page in pages for isbn in page],
+            list(Book.objects.order_by('title', 'id').values_list(
+                'isbn', flat=True)))
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        response = self.get_book_list(
+            before=response.context['previous_cursor'])
+        self.assertEqual(
+            [book.isbn for book in response.context['book_list']], pages[1])
+
+    def test_book_list_ignores_invalid_cursor(self):
+        """
+        Test that a malformed cursor shows the first page.
+        """
+        response = self.get_book_list(after='not a cursor')
+        self.assertEqual(
+            response.context['book_list'][0].isbn, '0')
+
+    def test_book_detail_query_count(self):
+        """
+        Test that the book detail page costs a fixed number of queries,
+        whatever the number of copies and authors of the book.
+        """
+        book = Book.objects.get(isbn='1')
+        BookCopy.objects.bulk_create(BookCopy(book=book) for _ in range(10))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(book.get_absolute_url())
+        with self.assertNumQueries(2):
+            # book, copies, the category is cached.
+            response = self.client.get(book.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Maintenance', count=10)
+        self.assertContains(response, 'Author 1 and Author 2')
+
+
+# ====================MODELS TESTS==================================
+class BookAuthorsDisplayTests(TestCase):
+    def setUp(self):
+        self.category = Categories.objects.create(name='Fiction')
+        self.book = Book.objects.create(
+            isbn='1', title='Ipsum lorem', publication_year=2000,
+            categories=self.category)
+        self.authors = [
+            Author.objects.create(name=f'Author {letter}')
+            for letter in 'ABC']
+
+    def authors_display(self) -> str:
+        return Book.objects.get(id=self.book.id).authors_display
+
+    def test_format_authors_display(self):
+        """
+        Test the author names joining for every number of authors.
+        """
+        self.assertEqual(format_authors_display([]), '')
+        self.assertEqual(format_authors_display(['A']), 'A')
+        self.assertEqual(format_authors_display(['A', 'B']), 'A and B')
+        self.assertEqual(
+            format_authors_display(['A', 'B', 'C']), 'A, B and C')
+
+    def test_authors_display_follows_relation_changes(self):
+        """
+        Test that adding, removing and renaming authors keeps
+        authors_display and __str__ in sync.
+        """
+        self.assertEqual(str(self.book), 'Ipsum lorem by authors unknown')
+        self.book.authors.add(*self.authors)
+        self.assertEqual(
+            self.authors_display(), 'Author A, Author B and Author C')
+        self.book.authors.remove(self.authors[1])
+        self.assertEqual(self.authors_display(), 'Author A and Author C')
+        BooksAuthors.objects.get(author=self.authors[2]).delete()
+        self.assertEqual(self.authors_display(), 'Author A')
+        self.authors[0].name = 'Author Z'
+        self.authors[0].save()
+        self.assertEqual(self.authors_display(), 'Author Z')
+        self.authors[0].book_set.clear()
+        self.assertEqual(self.authors_display(), '')
+        BooksAuthors.objects.create(book=self.book, author=self.authors[1])
+        book = Book.objects.get(id=self.book.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(str(book), 'Ipsum lorem by Author B')
+
+    def test_imported_books_have_authors_display(self):
+        """
+        Test that the importer and the sync mode set authors_display.
+        """
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        data_import.import_books_from_csv(write_dataset_csv(
+            Path(temp_dir.name), [dataset_row('2', authors='A;B')]))
+        self.assertEqual(
+            Book.objects.get(isbn='2').authors_display, 'A and B')
+        data_import.sync_books_from_csv(write_dataset_csv(
+            Path(temp_dir.name), [dataset_row('2', authors='B;C;A')]))
+        self.assertEqual(
+            Book.objects.get(isbn='2').authors_display, 'B, C and A')
+
+
+class BookCopyCountersTests(TestCase):
+    def setUp(self):
+        category = Categories.objects.create(name='Fiction')
+        self.books = [
+            Book.objects.create(
+                isbn=str(isbn), title='Ipsum lorem', publication_year=2000,
+                categories=category)
+            for isbn in range(2)]
+
+    def assertCounters(self, book: Book, available=0, on_loan=0,
+                       reserved=0, maintenance=0):
+        book.refresh_from_db()
+        self.assertEqual(
+            (book.copies_available, book.copies_on_loan,
+             book.copies_reserved, book.copies_maintenance),
+            (available, on_loan, reserved, maintenance))
+
+    def test_counters_follow_copy_changes(self):
+        """
+        Test that creating, changing and deleting copies updates the
+        counters of the affected books.
+        """
+        book_copy = BookCopy.objects.create(book=self.books[0])
+        BookCopy.objects.create(
+            book=self.books[0], status=BookCopy.LoanStatus.AVAILABLE)
+        self.assertCounters(self.books[0], available=1, maintenance=1)
+        book_copy = BookCopy.objects.get(id=book_copy.id)
+        book_copy.status = BookCopy.LoanStatus.ON_LOAN
+        book_copy.save()
+        book_copy.save()
+        self.assertCounters(self.books[0], available=1, on_loan=1)
+        book_copy.book = self.books[1]
+        book_copy.status = BookCopy.LoanStatus.RESERVED
+        book_copy.save()
+        self.assertCounters(self.books[0], available=1)
+        self.assertCounters(self.books[1], reserved=1)
+        book_copy.delete()
+        self.assertCounters(self.books[1])
+        self.assertEqual(self.books[0].copies_total, 1)
+
+    def test_counters_follow_copies_loaded_with_deferred_fields(self):
+        """
+        Test that copies loaded without their book or status still move
+        their counts when saved or deleted.
+        """
+        book_copy = BookCopy.objects.create(book=self.books[0])
+        book_copy = BookCopy.objects.only('id', 'status').get(id=book_copy.id)
+        book_copy.status = BookCopy.LoanStatus.ON_LOAN
+        book_copy.save()
+        self.assertCounters(self.books[0], on_loan=1)
+        book_copy = BookCopy.objects.defer('status').get(id=book_copy.id)
+        book_copy.save()
+        self.assertCounters(self.books[0], on_loan=1)
+        BookCopy.objects.only('id').get(id=book_copy.id).delete()
+        self.assertCounters(self.books[0])
+
+    def test_reconcile_copy_counters_command(self):
+        """
+        Test that the reconcile command repairs counters left wrong by a
+        bulk status update.
+        """
+        for _ in range(3):
+            BookCopy.objects.create(book=self.books[0])
+        BookCopy.objects.update(status=BookCopy.LoanStatus.AVAILABLE)
+        self.assertCounters(self.books[0], maintenance=3)
+        out = io.StringIO()
+        call_command('reconcile_copy_counters', batch_size=1, stdout=out)
+        self.assertCounters(self.books[0], available=3)
+        self.assertIn('1 had wrong copy counters', out.getvalue())
+
+    def test_drifted_counters_dont_fail_saves(self):
+        """
+        Test that changing copies created in bulk, which left the counters
+        at 0, doesn't decrement them below 0.
+        """
+        BookCopy.objects.bulk_create(
+            BookCopy(book=self.books[0], status=BookCopy.LoanStatus.AVAILABLE)
+            for _ in range(2))
+        loans.checkout(self.books[0].id, User.objects.create_user('user'))
+        self.assertCounters(self.books[0], on_loan=1)
+        Book.reconcile_copy_counters([self.books[0].id])
+        self.assertCounters(self.books[0], available=1, on_loan=1)
+
+
+class BookCopyDisplayTests(TestCase):
+    copy_count = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        book = Book.objects.create(
+            isbn='9780000000001', title='Ipsum lorem', publication_year=2000,
+            categories=Categories.objects.create(name='Fiction'))
+        borrower = User.objects.create_user('borrower')
+        BookCopy.objects.bulk_create(
+            BookCopy(book=book, status=BookCopy.LoanStatus.ON_LOAN,
+                     borrower=borrower, due_back=datetime.date(2023, 3, 1))
+            for _ in range(cls.copy_count))
+
+    def test_rendering_copies_costs_constant_queries(self):
+        """
+        Test that rendering copies never fetches their book or borrower.
+        """
+        with self.assertNumQueries(1):
+            copy_strings = [str(book_copy)
+                            for book_copy in BookCopy.objects.all()]
+        self.assertEqual(len(copy_strings), self.copy_count)
+        self.assertRegex(
+            copy_strings[0],
+            r'^Book #\d+\. On loan to user #\d+, due back on 2023-03-01\.$')
+        with self.assertNumQueries(1):
+            copy_strings = [
+                str(book_copy) for book_copy in
+                BookCopy.objects.select_related('book', 'borrower')]
+        self.assertEqual(
+            copy_strings[0],
+            'Ipsum lorem by authors unknown. '
+            'On loan to borrower, due back on 2023-03-01.')
+
+    def test_repr_never_queries(self):
+        """
+        Test that repr of copies with deferred fields doesn't load them.
+        """
+        book_copies = list(BookCopy.objects.only('id'))
+        with self.assertNumQueries(0):
+            copy_reprs = [repr(book_copy) for book_copy in book_copies]
+        self.assertEqual(
+            copy_reprs[0],
+            f'<BookCopy>: {book_copies[0].pk} status=None book_id=None')
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """The test database is the primary, a separate SQLite file the replica.
+
+    No replication takes place, so a book's database tells where it was
+    read from. The replica is set up here as the test runner only creates
+    databases of configured aliases.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+            'replica': {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': Path(cls.temp_dir.name) / 'replica.sqlite3',
+            },
+        })['replica']
+        call_command('migrate', database='replica', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.temp_dir.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.addCleanup(lookups.clear)
+        self.addCleanup(
+            call_command, 'flush', database='replica', interactive=False,
+            verbosity=0)
+        book = Book.objects.create(
+            isbn='9780000000001', title=f'Title on {DEFAULT_DB_ALIAS}',
+            publication_year=2000,
+            categories=Categories.objects.create(name='Ipsum'))
+        # The replica mirrors the primary, ids included.
+        Book.objects.using('replica').create(
+            id=book.id, isbn=book.isbn, title='Title on replica',
+            publication_year=book.publication_year,
+            categories=Categories.objects.using('replica').create(
+                id=book.categories_id, name='Ipsum'))
+
+    def test_request_reads_from_replica(self):
+        """
+        Test that browsing the catalog reads books from the replica.
+        """
+        response = self.client.get(reverse('books'))
+        self.assertContains(response, 'Title on replica')
+        self.assertNotContains(response, 'Title on default')
+
+    def test_browsing_requests_arent_pinned(self):
+        """
+        Test that browsing the catalog, with its categories set from the
+        cached lookup, doesn't pin the client to the primary.
+        """
+        book = Book.objects.get()
+        for url in (reverse('books'), book.get_absolute_url()):
+            # Routing a write is what pins a request.
+            with mock.patch.object(
+                    ReplicaRouter, 'db_for_write', autospec=True,
+                    return_value=DEFAULT_DB_ALIAS) as db_for_write:
+                response = self.client.get(url)
+            self.assertContains(response, 'Title on replica')
+            self.assertContains(response, 'Ipsum')
+            db_for_write.assert_not_called()
+
+    def test_reads_after_write_request_are_pinned(self):
+        """
+        Test that the requests following a write request read from the
+        primary.
+        """
+        response = self.client.post(reverse('book-search'))
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('books'))
+        self.assertContains(response, 'Title on default')
+
+    def test_reads_after_write_in_request_are_pinned(self):
+        """
+        Test that a request's reads after its first write, and reads of
+        unreplicated models, go to the primary.
+        """
+        router = ReplicaRouter()
+        token = request_routing.set(RequestRouting(pinned=False))
+        self.addCleanup(request_routing.reset, token)
+        self.assertEqual(router.db_for_read(Book), 'replica')
+        self.assertEqual(router.db_for_read(BookCopy), DEFAULT_DB_ALIAS)
+        book = Book.objects.get()
+        self.assertEqual(book.title, 'Title on replica')
+        book.ratings_count = 1
+        book.save(update_fields=['ratings_count'])
+        self.assertEqual(router.db_for_read(Book), DEFAULT_DB_ALIAS)
+        self.assertEqual(Book.objects.get().title, 'Title on default')
+
+    def test_reads_outside_requests_use_primary(self):
+        """
+        Test that reads outside requests (imports, commands) go to the
+        primary.
+        """
+        self.assertEqual(Book.objects.get().title, 'Title on default')
+
+
+class LoansTests(TestCase):
+    today = datetime.date(2023, 3, 1)
+
+    def setUp(self):
+        self.book = Book.objects.create(
+            isbn='9780000000001', title='Ipsum lorem', publication_year=2000,
+            categories=Categories.objects.create(name='Fiction'))
+        self.copies = [
+            BookCopy.objects.create(
+                book=self.book, status=BookCopy.LoanStatus.AVAILABLE)
+            for _ in range(2)]
+        self.users = [
+            User.objects.create_user(f'user{number}') for number in range(3)]
+
+    def assertCounters(self, available=0, on_loan=0, reserved=0):
+        self.book.refresh_from_db()
+        self.assertEqual(
+            (self.book.copies_available, self.book.copies_on_loan,
+             self.book.copies_reserved),
+            (available, on_loan, reserved))
+
+    def test_checkout_and_return(self):
+        """
+        Test that checking out lends distinct copies until none is left,
+        and that returning makes a copy available again.
+        """
+        book_copies = [
+            loans.checkout(self.book.id, user, self.today)
+            for user in self.users[:2]]
+        self.assertEqual(
+            {book_copy.id for book_copy in book_copies},
+            {book_copy.id for book_copy in self.copies})
+        self.assertEqual(
+            book_copies[0].due_back, self.today + loans.LOAN_PERIOD)
+        self.assertCounters(on_loan=2)
+        with self.assertRaises(loans.LoanError):
+            loans.checkout(self.book.id, self.users[2], self.today)
+        loans.return_copy(book_copies[0].id)
+        self.assertCounters(available=1, on_loan=1)
+        book_copy = BookCopy.objects.get(id=book_copies[0].id)
+        self.assertEqual(
+            (book_copy.status, book_copy.borrower, book_copy.due_back),
+            (BookCopy.LoanStatus.AVAILABLE, None, None))
+
+    def test_reservation_is_kept_for_borrower(self):
+        """
+        Test that a reserved copy is only lent to the user who reserved it.
+        """
+        reserved_copy = loans.reserve(self.book.id, self.users[0], self.today)
+        self.assertCounters(available=1, reserved=1)
+        loans.checkout(self.book.id, self.users[1], self.today)
+        with self.assertRaises(loans.LoanError):
+            loans.checkout(self.book.id, self.users[2], self.today)
+        self.assertEqual(
+            loans.checkout(self.book.id, self.users[0], self.today).id,
+            reserved_copy.id)
+        self.assertCounters(on_loan=2)
+
+    def test_checkout_looks_past_changed_candidates(self):
+        """
+        Test that a checkout whose first candidates changed meanwhile keeps
+        looking for an available copy.
+        """
+        change_status = loans._change_status
+        changed_copy_ids = []
+
+        def change_status_after_concurrent_checkout(book_copy, *args, **kw):
+            if not changed_copy_ids:
+                changed_copy_ids.append(book_copy.id)
+                return False
+            return change_status(book_copy, *args, **kw)
+
+        with mock.patch.object(loans, 'MAX_CANDIDATE_COPIES', 1), \
+                mock.patch.object(
+                    loans, '_change_status',
+                    change_status_after_concurrent_checkout):
+            book_copy = loans.checkout(self.book.id, self.users[0], self.today)
+        self.assertNotEqual(book_copy.id, changed_copy_ids[0])
+        self.assertCounters(available=1, on_loan=1)
+
+    def test_renew(self):
+        """
+        Test that only the borrower can renew a loan.
+        """
+        book_copy = loans.checkout(self.book.id, self.users[0], self.today)
+        with self.assertRaises(loans.LoanError):
+            loans.renew(book_copy.id, self.users[1], self.today)
+        later = self.today + datetime.timedelta(days=10)
+        self.assertEqual(
+            loans.renew(book_copy.id, self.users[0], later).due_back,
+            later + loans.LOAN_PERIOD)
+        self.assertCounters(available=1, on_loan=1)
+
+    def test_due_date_queries_use_indexes(self):
+        """
+        Test that the overdue and next due back queries are answered from
+        the loan indexes.
+        """
+        for user, days_ago in ((self.users[0], 30), (self.users[1], 10)):
+            loans.checkout(
+                self.book.id, user,
+                self.today - datetime.timedelta(days=days_ago))
+        self.assertEqual(loans.overdue_copies(self.today).count(), 1)
+        self.assertEqual(
+            loans.next_due_back(self.book.id),
+            self.today - datetime.timedelta(days=30) + loans.LOAN_PERIOD)
+        self.assertIn(
+            'catalog_copy_status_due_idx',
+            loans.overdue_copies(self.today).explain())
+        self.assertIn(
+            'catalog_copy_book_status_idx',
+            BookCopy.objects.filter(
+                book_id=self.book.id,
+                status=BookCopy.LoanStatus.ON_LOAN).order_by(
+                'due_back').explain())
+
+
+class ProcessOverdueCopiesTests(TestCase):
+    today = datetime.date(2023, 3, 1)
+
+    def setUp(self):
+        self.book = Book.objects.create(
+            isbn='9780000000001', title='Ipsum lorem', publication_year=2000,
+            categories=Categories.objects.create(name='Fiction'))
+        self.user = User.objects.create_user('user')
+
+    def create_copies(self, status, due_backs):
+        return [
+            BookCopy.objects.create(
+                book=self.book, status=status, borrower=self.user,
+                due_back=self.today + datetime.timedelta(days=days))
+            for days in due_backs]
+
+    def test_process_overdue_copies(self):
+        """
+        Test that overdue loans are marked once and expired reservations are
+        made available, in chunks.
+        """
+        overdue = self.create_copies(
+            BookCopy.LoanStatus.ON_LOAN, (-3, -2, -2, -1, -1))
+        on_loan = self.create_copies(BookCopy.LoanStatus.ON_LOAN, (0, 1))
+        expired = self.create_copies(BookCopy.LoanStatus.RESERVED, (-1, -1))
+        reserved = self.create_copies(BookCopy.LoanStatus.RESERVED, (0,))
+        out = io.StringIO()
+        with self.assertNumQueries(
+                # Marking: 3 chunk reads and updates, and an empty read.
+                3 * 2 + 1
+                # Expiring: a chunk read, its savepoint, SQLite write lock,
+                # book ids read, update and 3 queries reconciling the
+                # counters, and an empty read.
+                + 1 + 2 + 1 + 2 + 3 + 1):
+            call_command(
+                'process_overdue_copies', batch_size=2,
+                date=self.today.isoformat(), stdout=out)
+        self.assertIn('Chunk 3: Marked 1 overdue loans in ', out.getvalue())
+        self.assertIn(
+            'Marked 5 overdue loans, expired 2 reservations.', out.getvalue())
+        self.assertEqual(
+            set(BookCopy.objects.filter(
+                marked_overdue_on=self.today).values_list('id', flat=True)),
+            {book_copy.id for book_copy in overdue})
+        self.assertEqual(
+            set(BookCopy.objects.filter(
+                status=BookCopy.LoanStatus.AVAILABLE).values_list(
+                'id', flat=True)),
+            {book_copy.id for book_copy in expired})
+        self.book.refresh_from_db()
+        self.assertEqual(
+            (self.book.copies_available, self.book.copies_on_loan,
+             self.book.copies_reserved),
+            (2, len(overdue) + len(on_loan), len(reserved)))
+
+        out = io.StringIO()
+        call_command(
+            'process_overdue_copies', date=self.today.isoformat(), stdout=out)
+        self.assertIn(
+            'Marked 0 overdue loans, expired 0 reservations.', out.getvalue())
+
+    def test_renewal_clears_overdue_mark(self):
+        """
+        Test that renewing or returning a loan clears its overdue mark.
+        """
+        renewed, returned = self.create_copies(
+            BookCopy.LoanStatus.ON_LOAN, (-1, -1))
+        self.assertEqual(sum(loans.mark_overdue_copies(self.today)), 2)
+        loans.renew(renewed.id, self.user, self.today)
+        loans.return_copy(returned.id)
+        self.assertFalse(BookCopy.objects.filter(
+            marked_overdue_on__isnull=False).exists())
+
+
+class LoansConcurrencyTests(TransactionTestCase):
+    copy_count = 5
+    borrower_count = 20
+
+    def test_concurrent_checkouts_of_a_title(self):
+        """
+        Test that many parallel checkouts of the same title lend every
+        copy exactly once.
+        """
+        book = Book.objects.create(
+            isbn='9780000000001', title='Ipsum lorem', publication_year=2000,
+            categories=Categories.objects.create(name='Fiction'))
+        for _ in range(self.copy_count):
+            BookCopy.objects.create(
+                book=book, status=BookCopy.LoanStatus.AVAILABLE)
+        borrowers = [
+            User.objects.create_user(f'user{number}')
+            for number in range(self.borrower_count)]
+
+        def borrow(borrower):
+            try:
+                return loans.checkout(book.id, borrower).id
+            except loans.LoanError as error:
+                return error
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.borrower_count) as executor:
+            # Any other exception, e.g. a failed lock wait, is raised here.
+            outcomes = list(executor.map(borrow, borrowers))
+        lent_copy_ids = [
+            outcome for outcome in outcomes
+            if not isinstance(outcome, loans.LoanError)]
+        self.assertEqual(len(lent_copy_ids), self.copy_count)
+        self.assertEqual(len(set(lent_copy_ids)), self.copy_count)
+        self.assertEqual(
+            BookCopy.objects.filter(
+                status=BookCopy.LoanStatus.ON_LOAN).values(
+                'borrower').distinct().count(),
+            self.copy_count)
+        book.refresh_from_db()
+        self.assertEqual(
+            (book.copies_available, book.copies_on_loan),
+            (0, self.copy_count))
+
+
+class CatalogAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser('admin'))
+        self.book = Book.objects.create(
+            isbn='9780000000001', title='Ipsum lorem', publication_year=2000,
+            categories=Categories.objects.create(name='Fiction'))
+        self.other_book = Book.objects.create(
+            isbn='9780000000002', title='Dolor sit', publication_year=2000,
+            categories=self.book.categories)
+
+    def create_copies(self, count):
+        borrower = User.objects.create_user(f'user{BookCopy.objects.count()}')
+        return BookCopy.objects.bulk_create(
+            BookCopy(book=self.book, status=BookCopy.LoanStatus.ON_LOAN,
+                     borrower=borrower, due_back=datetime.date(2023, 3, 1))
+            for _ in range(count))
+
+    def get_changelist(self, model_name, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse(f'admin:catalog_{model_name}_changelist'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_copy_changelist_queries_are_bounded(self):
+        """
+        Test that listing copies costs the same queries however many copies
+        are listed.
+        """
+        self.create_copies(2)
+        _, few_copies_queries = self.get_changelist('bookcopy')
+        self.create_copies(50)
+        response, many_copies_queries = self.get_changelist('bookcopy')
+        self.assertContains(response, '52 book copys')
+        self.assertEqual(len(many_copies_queries), len(few_copies_queries))
+
+    def test_unfiltered_changelist_count_is_estimated(self):
+        """
+        Test that unfiltered changelists of big tables aren't counted, and
+        that filtered ones are counted exactly.
+        """
+        self.create_copies(3)
+        with mock.patch.object(catalog_admin, 'EXACT_COUNT_THRESHOLD', 2):
+            response, queries = self.get_changelist('bookcopy')
+            self.assertContains(response, '3 book copys')
+            self.assertFalse(any(
+                'COUNT(' in sql and 'catalog_bookcopy' in sql
+                for sql in queries))
+            response, queries = self.get_changelist(
+                'bookcopy', status__exact=BookCopy.LoanStatus.ON_LOAN)
+            self.assertContains(response, '3 book copys')
+            self.assertEqual(
+                sum('COUNT(' in sql and 'catalog_bookcopy' in sql
+                    for sql in queries), 1)
+
+    def test_searches(self):
+        """
+        Test that books are searched by full text or ISBN, and copies by id
+        or their book's ISBN.
+        """
+        book_copy, = self.create_copies(1)
+        response, _ = self.get_changelist('book', q='lorem')
+        self.assertContains(response, 'Ipsum lorem')
+        self.assertNotContains(response, 'Dolor sit')
+        response, _ = self.get_changelist('book', q=self.other_book.isbn)
+        self.assertContains(response, 'Dolor sit')
+        self.assertNotContains(response, 'Ipsum lorem')
+        for search_term in (str(book_copy.id), self.book.isbn):
+            response, _ = self.get_changelist('bookcopy', q=search_term)
+            self.assertContains(response, '1 book copy')
+        response, _ = self.get_changelist('bookcopy', q=self.other_book.isbn)
+        self.assertContains(response, '0 book copys')
+        response, _ = self.get_changelist('categories', q='Fic')
+        self.assertContains(response, '1 categories')
+
+    def test_book_autocomplete(self):
+        """
+        Test that a copy's book is picked by a full-text search.
+        """
+        response = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'catalog', 'model_name': 'bookcopy',
+            'field_name': 'book', 'term': 'dolor'})
+        self.assertEqual(
+            [result['id'] for result in response.json()['results']],
+            [str(self.other_book.id)])
@@ -3,4 +3,7 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
+    path('', views.BookListView.as_view(), name='books'),
+    path('book/<int:pk>', views.BookDetailView.as_view(), name='book-detail'),
+    path('search', views.book_search, name='book-search'),
 ]
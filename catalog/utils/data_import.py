@@ -1,17 +1,39 @@
 import csv
+import io
+import json
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 # import datetime
-from decimal import Decimal
-# from itertools import islice
+from decimal import Decimal, InvalidOperation
+from itertools import islice
 from pathlib import Path
 from pprint import pprint
 # from random import randint
+from typing import BinaryIO, Callable, Iterable, Iterator, NamedTuple
 
-# from django.db.models import Model
+import django
+from django.db import transaction
+from django.db.models import Model
 
-from ..models import Author, Categories, Book  # , BookCopy
+from ..lookups import MODEL_LOOKUPS
+from ..models import (  # , BookCopy
+    Author, Categories, Book, BooksAuthors, format_authors_display)
+from ..signals import authors_display_refresh_skipped
 
 DATASET_ROOT = Path(__file__).parent / 'datasets/'
 DATASET_7K_BOOKS = DATASET_ROOT / 'books_7k.csv'
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_NAME_IDS_MAX_SIZE = 100_000
+DEFAULT_PARSE_RANGE_SIZE = 4 * 1024 * 1024
+DATASET_ENCODING = 'utf-8'
+# Book fields set from the dataset, compared when syncing by ISBN.
+SYNCED_BOOK_FIELDS = (
+    'isbn', 'title', 'subtitle', 'publication_year', 'thumbnail', 'summary',
+    'page_count', 'average_rating', 'ratings_count', 'authors_display',
+)
+AUTHORS_SEPARATOR = ';'
 
 
 def get_sample_entry_from_csv(csv_file: Path, print_=False, temp_file=True):
@@ -70,9 +92,590 @@ def get_field_values_from_csv(
     return values if return_values else None
 
 
-def import_7k_books():
+class BookRecord(NamedTuple):
+    """A normalized dataset row, ready to be written to the database.
+
+    fields: Book field values, excluding the relations.
+    categories_name: The name of the book's category.
+    author_names: The names of the book's authors, without duplicates.
+    """
+    fields: dict
+    categories_name: str
+    author_names: list[str]
+
+
+def _parse_int(value: str, default: int = 0) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _parse_decimal(value: str, default: Decimal) -> Decimal:
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return default
+
+
+def _batched(iterable: Iterable, batch_size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def normalize_book_row(book_row: dict) -> BookRecord:
+    """Convert a raw 7k books dataset csv row into a BookRecord.
+
+    Empty or malformed numeric values fall back to the Book field defaults
+    instead of aborting the import.
+
+    :param book_row: A csv row as returned by csv.DictReader.
+    :return: The normalized BookRecord.
+    """
+    author_names = list(dict.fromkeys(
+        author_name.strip()
+        for author_name
+        in book_row['authors'].split(AUTHORS_SEPARATOR)
+        if author_name.strip()
+    ))
+    return BookRecord(
+        fields={
+            'isbn': book_row['isbn13'],
+            'title': book_row['title'],
+            'subtitle': book_row['subtitle'],
+            'publication_year': _parse_int(book_row['published_year']),
+            'thumbnail': book_row['thumbnail'],
+            'summary': book_row['description'],
+            'page_count': _parse_int(book_row['num_pages']),
+            'average_rating': _parse_decimal(
+                book_row['average_rating'],
+                Book._meta.get_field('average_rating').default),
+            'ratings_count': _parse_int(book_row['ratings_count']),
+            'authors_display': format_authors_display(author_names),
+        },
+        categories_name=book_row['categories'] or Categories.UNKNOWN,
+        author_names=author_names,
+    )
+
+
+class NameIds:
+    """A size bounded name to id map of a model with a unique-ish name field.
+
+    The most recently used names are kept in memory, up to max_size
+    entries. Names missing from memory are looked up in the database and
+    created there when absent, with one bulk query per batch of names, so
+    memory use does not grow with the size of the imported dataset.
+
+    The ids are written into rows, so they're never taken from the catalog
+    lookups' caches (see catalog.lookups), which may hold ids deleted by
+    the current transaction. The resolved names are cached there for the
+    views once the import commits.
+    """
+
+    def __init__(
+            self, model: type[Model],
+            max_size: int = DEFAULT_NAME_IDS_MAX_SIZE
+    ):
+        self.model = model
+        self.lookup = MODEL_LOOKUPS[model]
+        self.max_size = max_size
+        self._ids = OrderedDict()
+
+    def _remember(self, name: str, id_: int):
+        self._ids[name] = id_
+        self._ids.move_to_end(name)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+    def resolve(
+            self, names: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> dict[str, int]:
+        """Get the ids of names, creating rows for unknown names.
+
+        :param names: The names to resolve, duplicates are allowed.
+        :param batch_size: The maximal number of names per database query.
+        :return: A name to id dict for every name in names.
+        """
+        name_ids = {}
+        missing_names = []
+        for name in dict.fromkeys(names):
+            if name in self._ids:
+                self._ids.move_to_end(name)
+                name_ids[name] = self._ids[name]
+            else:
+                missing_names.append(name)
+        for names_batch in _batched(missing_names, batch_size):
+            found_ids = dict(
+                self.model.objects.filter(
+                    name__in=names_batch).values_list('name', 'id'))
+            self.lookup.remember(found_ids)
+            name_ids.update(found_ids)
+        new_objects = self.model.objects.bulk_create(
+            (self.model(name=name)
+             for name in missing_names if name not in name_ids),
+            batch_size=batch_size)
+        new_name_ids = {
+            new_object.name: new_object.id for new_object in new_objects}
+        self.lookup.remember(new_name_ids)
+        name_ids.update(new_name_ids)
+        for name in missing_names:
+            self._remember(name, name_ids[name])
+        return name_ids
+
+
+def _write_books_batch(
+        book_records: list[BookRecord], categories_ids: NameIds,
+        authors_ids: NameIds, batch_size: int
+):
+    """Write a batch of book records with their categories and authors."""
+    batch_categories_ids = categories_ids.resolve(
+        (book_record.categories_name for book_record in book_records),
+        batch_size)
+    batch_authors_ids = authors_ids.resolve(
+        (author_name
+         for book_record in book_records
+         for author_name in book_record.author_names),
+        batch_size)
+    books = Book.objects.bulk_create(
+        (
+            Book(
+                categories_id=batch_categories_ids[
+                    book_record.categories_name],
+                **book_record.fields)
+            for book_record in book_records
+        ),
+        batch_size=batch_size)
+    BooksAuthors.objects.bulk_create(
+        (
+            BooksAuthors(
+                book_id=book.id, author_id=batch_authors_ids[author_name])
+            for book, book_record in zip(books, book_records)
+            for author_name in book_record.author_names
+        ),
+        batch_size=batch_size)
+
+
+class _TrackedLines:
+    """Iterate over the decoded lines of a binary file while tracking the
+    byte offset right after the last line read.
+
+    csv readers only pull the lines of the record they are parsing, so
+    after each parsed record the offset is a valid record boundary.
+    """
+
+    def __init__(self, binary_io: BinaryIO, offset: int):
+        self._binary_io = binary_io
+        self.offset = offset
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        line = self._binary_io.readline()
+        if not line:
+            raise StopIteration
+        self.offset += len(line)
+        return line.decode(DATASET_ENCODING)
+
+
+def _read_header(csv_file: Path) -> tuple[list[str], int]:
+    """Get the field names of a csv and the byte offset of its first row."""
+    with open(csv_file, 'rb') as data_source:
+        lines = _TrackedLines(data_source, 0)
+        return next(csv.reader(lines)), lines.offset
+
+
+def _parse_records(
+        lines: _TrackedLines, field_names: list[str]
+) -> Iterator[tuple[BookRecord, int]]:
+    for book_row in csv.DictReader(lines, fieldnames=field_names):
+        yield normalize_book_row(book_row), lines.offset
+
+
+def read_book_records(
+        csv_file: Path, offset: int = 0
+) -> Iterator[tuple[BookRecord, int]]:
+    """Lazily read and normalize the rows of a books dataset csv.
+
+    :param csv_file: The csv file to read the books from.
+    :param offset: A byte offset of a record boundary to start reading
+        from, as previously yielded by this function, 0 reads the whole file.
+    :return: An iterator of (book record, byte offset after the record).
+    """
+    field_names, header_end = _read_header(csv_file)
+    with open(csv_file, 'rb') as data_source:
+        data_source.seek(max(offset, header_end))
+        lines = _TrackedLines(data_source, max(offset, header_end))
+        yield from _parse_records(lines, field_names)
+
+
+def _split_byte_ranges(
+        csv_file: Path, start: int, range_size: int
+) -> Iterator[tuple[int, int]]:
+    """Split a csv from start into byte ranges of whole records.
+
+    Each range spans about range_size bytes and ends at a record boundary,
+    that is, at a line end preceded by an even number of quote characters
+    since the range start. Quotes are only counted, never parsed, so the
+    split is much cheaper than parsing the csv.
+    """
+    with open(csv_file, 'rb') as data_source:
+        data_source.seek(start)
+        while data := data_source.read(range_size):
+            end = start + len(data)
+            quote_count = data.count(b'"')
+            last_byte = data[-1:]
+            while last_byte != b'\n' or quote_count % 2:
+                line = data_source.readline()
+                if not line:
+                    break
+                end += len(line)
+                quote_count += line.count(b'"')
+                last_byte = line[-1:]
+            yield start, end
+            start = end
+
+
+def _parse_byte_range(
+        csv_file: Path, field_names: list[str], start: int, end: int
+) -> list[tuple[BookRecord, int]]:
+    """Read and normalize the records in a byte range of a csv."""
+    with open(csv_file, 'rb') as data_source:
+        data_source.seek(start)
+        data = data_source.read(end - start)
+    return list(_parse_records(
+        _TrackedLines(io.BytesIO(data), start), field_names))
+
+
+def read_book_records_parallel(
+        csv_file: Path, offset: int = 0, max_workers: int | None = None,
+        range_size: int = DEFAULT_PARSE_RANGE_SIZE,
+) -> Iterator[tuple[BookRecord, int]]:
+    """Read and normalize the rows of a books dataset csv in parallel.
+
+    The csv is split into byte ranges of whole records, which are parsed
+    and normalized by a pool of worker processes. The records are yielded
+    in csv order, exactly as read_book_records yields them, while at most
+    two ranges per worker are in flight to keep memory use bounded.
+
+    :param csv_file: The csv file to read the books from.
+    :param offset: See read_book_records.
+    :param max_workers: The number of worker processes, defaults to the
+        number of processors.
+    :param range_size: The approximate size in bytes of each parsed range.
+    :return: An iterator of (book record, byte offset after the record).
+    """
+    field_names, header_end = _read_header(csv_file)
+    byte_ranges = _split_byte_ranges(
+        csv_file, max(offset, header_end), range_size)
+    max_workers = max_workers or os.cpu_count()
+    executor = ProcessPoolExecutor(
+        max_workers=max_workers, initializer=django.setup)
+    try:
+        pending = deque()
+        for start, end in byte_ranges:
+            pending.append(executor.submit(
+                _parse_byte_range, csv_file, field_names, start, end))
+            if len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def _read_checkpoint(checkpoint_file: Path, csv_file: Path) -> dict:
+    if checkpoint_file.exists():
+        checkpoint = json.loads(checkpoint_file.read_text())
+        if checkpoint['csv_file'] == str(csv_file.resolve()):
+            return checkpoint
+    return {'csv_file': str(csv_file.resolve()), 'offset': 0, 'book_count': 0}
+
+
+def _write_checkpoint(checkpoint_file: Path, checkpoint: dict):
+    # Write to a temporary file first so that a crash never leaves a
+    # truncated checkpoint behind.
+    temp_checkpoint_file = checkpoint_file.with_name(
+        checkpoint_file.name + '.tmp')
+    temp_checkpoint_file.write_text(json.dumps(checkpoint))
+    os.replace(temp_checkpoint_file, checkpoint_file)
+
+
+def _import_batches(
+        csv_file: Path, write_batch: Callable[[list[BookRecord]], None],
+        batch_size: int, print_: bool, checkpoint_file: Path | None,
+        parse_workers: int | None
+) -> int:
+    """Stream the book records of csv_file to write_batch in batches.
+
+    See import_books_from_csv for the transaction, checkpoint and parse
+    workers semantics.
+
+    :return: The number of books read, including books read by previous
+        resumed attempts.
+    """
+    if checkpoint_file is None:
+        checkpoint = {'offset': 0, 'book_count': 0}
+        import_atomic, batch_atomic = transaction.atomic, nullcontext
+    else:
+        checkpoint = _read_checkpoint(checkpoint_file, csv_file)
+        import_atomic, batch_atomic = nullcontext, transaction.atomic
+    if parse_workers == 1:
+        book_records_reader = read_book_records(
+            csv_file, checkpoint['offset'])
+    else:
+        book_records_reader = read_book_records_parallel(
+            csv_file, checkpoint['offset'], parse_workers)
+    with import_atomic():
+        for batch in _batched(book_records_reader, batch_size):
+            book_records = [book_record for book_record, _ in batch]
+            with batch_atomic():
+                write_batch(book_records)
+            checkpoint['offset'] = batch[-1][1]
+            checkpoint['book_count'] += len(book_records)
+            if checkpoint_file is not None:
+                _write_checkpoint(checkpoint_file, checkpoint)
+            if print_:
+                print(f'{checkpoint["book_count"]} done.')
+    if checkpoint_file is not None:
+        checkpoint_file.unlink(missing_ok=True)
+    return checkpoint['book_count']
+
+
+def import_books_from_csv(
+        csv_file: Path, batch_size: int = DEFAULT_BATCH_SIZE, print_=False,
+        checkpoint_file: Path | None = None,
+        name_ids_max_size: int = DEFAULT_NAME_IDS_MAX_SIZE,
+        parse_workers: int | None = 1,
+) -> int:
+    """Import books from a books dataset csv using batched bulk inserts.
+
+    The csv is streamed once, categories and authors are resolved against
+    size bounded name to id maps and every Categories, Author, Book and
+    BooksAuthors row is written with bulk_create, so memory use is bounded
+    by batch_size and name_ids_max_size regardless of the csv size.
+
+    Without a checkpoint_file the whole import runs in a single
+    transaction. With a checkpoint_file each batch is committed in its own
+    transaction and the byte offset reached is recorded in the checkpoint
+    file after every commit, a later call with the same checkpoint file
+    resumes from there. The checkpoint file is removed once the import
+    completes. An attempt that crashed after committing a batch but
+    before recording it (possibly before writing any checkpoint) resumes
+    with that batch again, so with a checkpoint_file the first batch skips
+    the books whose ISBN is already imported.
+
+    With parse_workers other than 1 the csv is parsed and normalized by
+    read_book_records_parallel, while this process remains the single
+    writer of the batches.
+
+    :param csv_file: The csv file to import the books from.
+    :param batch_size: The number of books written per batch.
+    :param print_: Set to True to output the progress to the console.
+    :param checkpoint_file: A file for recording the import's progress.
+    :param name_ids_max_size: The maximal number of category and author
+        names kept in memory.
+    :param parse_workers: The number of csv parsing processes, None for
+        the number of processors, 1 parses in this process.
+    :return: The number of imported books, including books imported by
+        previous resumed attempts.
+    """
+    categories_ids = NameIds(Categories, name_ids_max_size)
+    authors_ids = NameIds(Author, name_ids_max_size)
+    replaying = checkpoint_file is not None
+
+    def write_batch(book_records: list[BookRecord]):
+        nonlocal replaying
+        if replaying:
+            imported_isbns = set(Book.objects.filter(isbn__in=[
+                book_record.fields['isbn'] for book_record in book_records
+            ]).values_list('isbn', flat=True))
+            book_records = [
+                book_record for book_record in book_records
+                if book_record.fields['isbn'] not in imported_isbns]
+            replaying = False
+        _write_books_batch(
+            book_records, categories_ids, authors_ids, batch_size)
+
+    return _import_batches(
+        csv_file, write_batch, batch_size, print_, checkpoint_file,
+        parse_workers)
+
+
+class SyncStats(NamedTuple):
+    """The number of books affected by a sync_books_from_csv call."""
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
+def _sync_books_batch(
+        book_records: list[BookRecord], categories_ids: NameIds,
+        authors_ids: NameIds, batch_size: int
+) -> SyncStats:
+    """Create, update or skip a batch of book records by their ISBN."""
+    # Later rows win over earlier rows with the same ISBN.
+    book_records = list({
+        book_record.fields['isbn']: book_record
+        for book_record in book_records
+    }.values())
+    batch_categories_ids = categories_ids.resolve(
+        (book_record.categories_name for book_record in book_records),
+        batch_size)
+    batch_authors_ids = authors_ids.resolve(
+        (author_name
+         for book_record in book_records
+         for author_name in book_record.author_names),
+        batch_size)
+    existing_books = {
+        book_values['isbn']: book_values
+        for book_values in Book.objects.filter(
+            isbn__in=[
+                book_record.fields['isbn'] for book_record in book_records
+            ]).values('id', 'categories_id', *SYNCED_BOOK_FIELDS)
+    }
+    existing_authors_ids = {}
+    for book_id, author_id in BooksAuthors.objects.filter(
+            book_id__in=[
+                book_values['id'] for book_values in existing_books.values()
+            ]).values_list('book_id', 'author_id'):
+        existing_authors_ids.setdefault(book_id, set()).add(author_id)
+    new_records, changed_books, changed_authors_books = [], [], []
+    for book_record in book_records:
+        book_values = existing_books.get(book_record.fields['isbn'])
+        if book_values is None:
+            new_records.append(book_record)
+            continue
+        categories_id = batch_categories_ids[book_record.categories_name]
+        authors_ids_ = {
+            batch_authors_ids[author_name]
+            for author_name in book_record.author_names}
+        fields_changed = (
+            categories_id != book_values['categories_id']
+            or any(book_record.fields[field_name] != book_values[field_name]
+                   for field_name in SYNCED_BOOK_FIELDS))
+        authors_changed = authors_ids_ != existing_authors_ids.get(
+            book_values['id'], set())
+        if authors_changed:
+            changed_authors_books.append((book_values['id'], book_record))
+        if fields_changed or authors_changed:
+            changed_books.append(Book(
+                id=book_values['id'], categories_id=categories_id,
+                **book_record.fields))
+    if new_records:
+        _write_books_batch(
+            new_records, categories_ids, authors_ids, batch_size)
+    # Skips the per row post_delete refresh of authors_display, which
+    # bulk_update below sets for these books.
+    with authors_display_refresh_skipped():
+        BooksAuthors.objects.filter(book_id__in=[
+            book_id for book_id, _ in changed_authors_books]).delete()
+    BooksAuthors.objects.bulk_create(
+        (
+            BooksAuthors(
+                book_id=book_id, author_id=batch_authors_ids[author_name])
+            for book_id, book_record in changed_authors_books
+            for author_name in book_record.author_names
+        ),
+        batch_size=batch_size)
+    Book.objects.bulk_update(
+        changed_books, ['categories', *SYNCED_BOOK_FIELDS],
+        batch_size=batch_size)
+    updated_count = len(changed_books)
+    return SyncStats(
+        created=len(new_records),
+        updated=updated_count,
+        unchanged=len(existing_books) - updated_count,
+    )
+
+
+def _delete_missing_books(csv_file: Path, batch_size: int) -> int:
+    """Delete the books whose ISBN no longer appears in csv_file.
+
+    Books that still have copies are kept, since BookCopy restricts their
+    deletion. Holds the csv's ISBNs in memory while running.
+
+    :return: The number of deleted books.
+    """
+    csv_isbns = {
+        book_record.fields['isbn']
+        for book_record, _ in read_book_records(csv_file)
+    }
+    missing_isbns = [
+        isbn
+        for isbn in Book.objects.values_list(
+            'isbn', flat=True).iterator(chunk_size=batch_size)
+        if isbn not in csv_isbns
+    ]
+    deleted_count = 0
+    for isbns_batch in _batched(missing_isbns, batch_size):
+        with transaction.atomic():
+            deleted_count += Book.objects.filter(
+                isbn__in=isbns_batch, bookcopy__isnull=True,
+            ).delete()[1].get(Book._meta.label, 0)
+    return deleted_count
+
+
+def sync_books_from_csv(
+        csv_file: Path, batch_size: int = DEFAULT_BATCH_SIZE, print_=False,
+        checkpoint_file: Path | None = None,
+        name_ids_max_size: int = DEFAULT_NAME_IDS_MAX_SIZE,
+        delete_missing=False, parse_workers: int | None = 1,
+) -> SyncStats:
+    """Incrementally sync the catalog with a books dataset csv by ISBN.
+
+    Unlike import_books_from_csv nothing is cleared beforehand: each batch
+    of csv rows is diffed against the existing books with the same ISBNs,
+    new books are bulk created, changed books and author lists are bulk
+    updated and unchanged books cost no writes at all. The transaction,
+    checkpoint and parse workers semantics are those of
+    import_books_from_csv.
+
+    :param csv_file: The csv file to sync the books from.
+    :param batch_size: The number of books diffed and written per batch.
+    :param print_: Set to True to output the progress to the console.
+    :param checkpoint_file: A file for recording the sync's progress.
+    :param name_ids_max_size: The maximal number of category and author
+        names kept in memory.
+    :param delete_missing: Set to True to also delete books missing from
+        the csv, books with copies are never deleted.
+    :param parse_workers: See import_books_from_csv.
+    :return: The SyncStats of this call, books synced by previous resumed
+        attempts are not counted.
+    """
+    categories_ids = NameIds(Categories, name_ids_max_size)
+    authors_ids = NameIds(Author, name_ids_max_size)
+    sync_stats = SyncStats()
+
+    def write_batch(book_records: list[BookRecord]):
+        nonlocal sync_stats
+        batch_stats = _sync_books_batch(
+            book_records, categories_ids, authors_ids, batch_size)
+        sync_stats = SyncStats(*map(sum, zip(sync_stats, batch_stats)))
+
+    _import_batches(
+        csv_file, write_batch, batch_size, print_, checkpoint_file,
+        parse_workers)
+    if delete_missing:
+        sync_stats = sync_stats._replace(
+            deleted=_delete_missing_books(csv_file, batch_size))
+    if print_:
+        print(sync_stats)
+    return sync_stats
+
+
+def import_7k_books(
+        batch_size: int = DEFAULT_BATCH_SIZE, print_=False,
+        checkpoint_file: Path | None = None,
+) -> int:
     """Import books from a 7k books dataset csv.
 
+    Any previously imported catalog data is cleared first. Without a
+    checkpoint_file this happens within the import's transaction, with a
+    checkpoint_file it is only done when not resuming a previous attempt.
+
     7k dataset Attributions:
         * Author : DylanCastillo
         * Link : Kaggle_
@@ -80,6 +683,11 @@ def import_7k_books():
         .. _Kaggle:
             https://www.kaggle.com/ datasets/
             dylanjcastillo/7k-books-with-metadata
+
+    :param batch_size: The number of books written per batch.
+    :param print_: Set to True to output the progress to the console.
+    :param checkpoint_file: See import_books_from_csv.
+    :return: The number of imported books.
     """
 
     def clear_prev_data():
@@ -87,72 +695,25 @@ def import_7k_books():
         Author.objects.all().delete()
         Categories.objects.all().delete()
 
-    #
-    # def bulk_import(model, names):
-    #     batch_size = 1000
-    #     while True:
-    #         batch = islice(names, batch_size)
-    #         if not batch:
-    #             break
-    #         model.objects.bulk_create(batch, batch_size=batch_size)
-    #
-    # def import_categories():
-    #     categories_names = get_field_values_from_csv(
-    #         csv_file=DATASET_7K_BOOKS, field_name='categories',
-    #         sub_list_sep=';', temp_file=False, return_values=True)
-    #     bulk_import(Categories, categories_names)
-
-    def books_data_from_dataset() -> dict:
-        with open(DATASET_7K_BOOKS, 'r', newline='') as data_source:
-            csv_dict_reader = csv.DictReader(data_source)
-            yield from csv_dict_reader
-
-    def create_book_from_dataset_data(_book_data_from_dataset: dict) -> Book:
-        categories_name = (
-            _book_data_from_dataset['categories']
-            if _book_data_from_dataset['categories']
-            else Categories.UNKNOWN
-        )
-        try:
-            page_count = int(_book_data_from_dataset['num_pages'])
-        except ValueError:
-            page_count = 0
-        return Book(
-            isbn=_book_data_from_dataset['isbn13'],
-            title=_book_data_from_dataset['title'],
-            subtitle=_book_data_from_dataset['subtitle'],
-            publication_year=int(_book_data_from_dataset['published_year']),
-            categories=Categories.objects.get_or_create(
-                name=categories_name)[0],
-            thumbnail=_book_data_from_dataset['thumbnail'],
-            summary=_book_data_from_dataset['description'],
-            page_count=page_count,
-            average_rating=Decimal(_book_data_from_dataset['average_rating']),
-            ratings_count=int(_book_data_from_dataset['ratings_count']),
-        )
-
-    def set_authors(_book: Book, _book_data_from_dataset: dict):
-        author_names = (
-            author_name.strip()
-            for author_name
-            in _book_data_from_dataset['authors'].split(';')
-        )
-        authors_list = list(
-            Author.objects.get_or_create(name=author_name)[0].id
-            for author_name
-            in author_names
-        )
-        _book.authors.add(*authors_list, through_defaults=None)
-
-    entry_limit = 1000
-    entry_count = 0
-    clear_prev_data()
-    for book_data_from_dataset in books_data_from_dataset():
-        if entry_count > entry_limit:
-            break
-        entry_count += 1
-        if (entry_count % (entry_limit / 10)) == 0:
-            print(f'{entry_count}/{entry_limit} done.')
-        book = create_book_from_dataset_data(book_data_from_dataset)
-        book.save()
-        set_authors(book, book_data_from_dataset)
+    if checkpoint_file is None:
+        with transaction.atomic():
+            clear_prev_data()
+            return import_books_from_csv(DATASET_7K_BOOKS, batch_size, print_)
+    if not checkpoint_file.exists():
+        with transaction.atomic():
+            clear_prev_data()
+    return import_books_from_csv(
+        DATASET_7K_BOOKS, batch_size, print_, checkpoint_file)
+
+
+def sync_7k_books(
+        batch_size: int = DEFAULT_BATCH_SIZE, print_=False,
+        checkpoint_file: Path | None = None, delete_missing=False,
+) -> SyncStats:
+    """Incrementally sync the catalog with the 7k books dataset csv.
+
+    See sync_books_from_csv and import_7k_books.
+    """
+    return sync_books_from_csv(
+        DATASET_7K_BOOKS, batch_size, print_, checkpoint_file,
+        delete_missing=delete_missing)
@@ -1 +1,114 @@
+import json
+
+from django.db.models import Q
+from django.http import Http404
 from django.shortcuts import render
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+from django.views.generic import TemplateView
+
+from .lookups import categories_lookup
+from .models import Book
+from .search import search_books
+
+
+def _encode_cursor(book: Book) -> str:
+    """Encode the keyset pagination position of book."""
+    return urlsafe_base64_encode(json.dumps([book.title, book.id]).encode())
+
+
+async def _aset_categories(books: list[Book]):
+    """Set the categories of books from the cached categories lookup."""
+    categories = await categories_lookup.aget_by_ids(
+        book.categories_id for book in books)
+    categories_field = Book._meta.get_field('categories')
+    for book in books:
+        # Categories deleted meanwhile are left to be fetched lazily.
+        if book.categories_id in categories:
+            # Cached directly, assigning routes the unsaved lookup object
+            # for writing, which pins the request to the primary database.
+            categories_field.set_cached_value(
+                book, categories[book.categories_id])
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int] | None:
+    """Decode a cursor made by _encode_cursor, None if it is invalid."""
+    try:
+        title, id_ = json.loads(urlsafe_base64_decode(cursor))
+        return str(title), int(id_)
+    except (ValueError, TypeError):
+        return None
+
+
+class BookListView(TemplateView):
+    """Books ordered by title, paginated by keyset rather than OFFSET.
+
+    Pages are addressed by the (title, id) of the book right before
+    (?after=) or right after (?before=) them, so every page is a single
+    index range scan of the title index no matter how deep it is.
+    """
+    template_name = 'catalog/book_list.html'
+    page_size = 20
+
+    async def get(self, request, *args, **kwargs):
+        books = Book.objects.all()
+        after = _decode_cursor(request.GET.get('after', ''))
+        before = _decode_cursor(request.GET.get('before', ''))
+        if before is not None:
+            title, id_ = before
+            book_list = [book async for book in books.filter(
+                Q(title__lt=title) | Q(title=title, id__lt=id_)
+            ).order_by('-title', '-id')[:self.page_size + 1]]
+            has_previous = len(book_list) > self.page_size
+            has_next = True
+            book_list = book_list[:self.page_size][::-1]
+        else:
+            if after is not None:
+                title, id_ = after
+                books = books.filter(
+                    Q(title__gt=title) | Q(title=title, id__gt=id_))
+            book_list = [book async for book in books.order_by(
+                'title', 'id')[:self.page_size + 1]]
+            has_previous = after is not None
+            has_next = len(book_list) > self.page_size
+            book_list = book_list[:self.page_size]
+        await _aset_categories(book_list)
+        return self.render_to_response(self.get_context_data(
+            book_list=book_list,
+            next_cursor=(
+                _encode_cursor(book_list[-1])
+                if has_next and book_list else None),
+            previous_cursor=(
+                _encode_cursor(book_list[0])
+                if has_previous and book_list else None),
+            **kwargs))
+
+
+class BookDetailView(TemplateView):
+    template_name = 'catalog/book_detail.html'
+
+    async def get(self, request, *args, pk, **kwargs):
+        try:
+            book = await Book.objects.prefetch_related(
+                'bookcopy_set').aget(pk=pk)
+        except Book.DoesNotExist:
+            raise Http404('No book matches the given query.')
+        await _aset_categories([book])
+        return self.render_to_response(self.get_context_data(
+            book=book, **kwargs))
+
+
+def book_search(request):
+    query = request.GET.get('q', '')
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    context = {
+        'query': query,
+        'search_page': search_books(query, page),
+    }
+    return render(
+        request=request,
+        template_name='catalog/book_search.html',
+        context=context,
+    )
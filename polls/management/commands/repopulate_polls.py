@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from polls.utils import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CHOICE_COUNT, DEFAULT_QUESTION_COUNT,
+    repopulate_polls)
+
+
+class Command(BaseCommand):
+    help = ('Replace all the polls with generated questions and choices, '
+            'e.g. to seed a load test database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--questions', type=int, default=DEFAULT_QUESTION_COUNT,
+            help='The number of questions to create.')
+        parser.add_argument(
+            '--choices', type=int, default=DEFAULT_CHOICE_COUNT,
+            help='The number of choices to create per question.')
+        parser.add_argument(
+            '--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+            help='The number of questions created per batch.')
+
+    def handle(self, *args, **options):
+        question_count, choice_count = repopulate_polls(
+            options['questions'], options['choices'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {question_count} questions '
+            f'and {choice_count} choices.'))
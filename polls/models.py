@@ -8,6 +8,14 @@ class Question(models.Model):
     question_text = models.CharField(max_length=200)
     publication_date = models.DateTimeField('date published')
 
+    class Meta:
+        indexes = [
+            # The index page lists the latest published questions.
+            models.Index(
+                fields=['-publication_date'],
+                name='polls_question_pub_date_idx'),
+        ]
+
     def is_future_publication(self):
         """
         Check if the question's publication date is in the future.
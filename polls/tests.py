@@ -5,14 +5,21 @@
 """
 
 # ====================IMPORTS=======================================
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from typing import Callable
+from unittest import mock
 
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
 from django.urls import reverse
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import override_settings
 from django.utils import timezone
 
-from .models import Question
+from .models import Choice, Question
+from .utils import LATEST_QUESTIONS_CACHE_KEY, VoteBuffer, repopulate_polls
 
 
 # ====================TESTING UTILITIES===============================
@@ -142,6 +149,9 @@ class QuestionModelTests(TestCase):
 
 # ====================VIEWS TESTS===================================
 class IndexViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
     def test_no_questions(self):
         """
         Test that the Question queryset is empty and that
@@ -220,7 +230,7 @@ class IndexViewTests(TestCase):
         )
         # check that the returned queryset is not empty.
         self.assertGreater(
-            response.context["questions_list"].count(), 0,
+            len(response.context["questions_list"]), 0,
             msg="Question queryset empty with past questions in "
                 "the db."
         )
@@ -265,7 +275,7 @@ class IndexViewTests(TestCase):
         )
         # check that the returned queryset is not empty.
         self.assertGreater(
-            response.context["questions_list"].count(), 0,
+            len(response.context["questions_list"]), 0,
             msg="Question queryset empty with both past and future questions "
                 "in the db."
         )
@@ -282,3 +292,288 @@ class IndexViewTests(TestCase):
             msg_prefix="Questions don't appear on the index page"
                        "with both past and future questions in the db.\n"
         )
+
+    async def test_index_under_asgi(self):
+        """
+        Test that the async index view serves the latest questions under
+        ASGI.
+        """
+        question = await Question.objects.acreate(
+            question_text="test_asgi_question",
+            publication_date=timezone.now() - timedelta(days=1))
+        response = await self.async_client.get(reverse("polls:index"))
+        self.assertEqual(response.context["questions_list"], [question])
+        self.assertContains(response, "test_asgi_question")
+
+    def test_latest_questions_are_cached(self):
+        """
+        Test that repeated index views don't query the database.
+        """
+        add_question_with_timedelta_offset(days=-1)
+        with self.assertNumQueries(2):
+            self.client.get(reverse("polls:index"))
+        with self.assertNumQueries(0):
+            self.client.get(reverse("polls:index"))
+
+    def test_cache_expires_when_next_question_is_published(self):
+        """
+        Test that the cached latest questions expire exactly when the next
+        future question becomes published.
+        """
+        now = timezone.now()
+        next_question = add_question_with_timedelta_offset(seconds=5)
+        with mock.patch("polls.utils.timezone.now", return_value=now), \
+                mock.patch.object(cache, "aset") as cache_set:
+            self.client.get(reverse("polls:index"))
+        cache_set.assert_called_once_with(
+            LATEST_QUESTIONS_CACHE_KEY, [],
+            (next_question.publication_date - now).total_seconds())
+
+
+class VoteViewTests(TestCase):
+    def setUp(self):
+        self.question = add_question_with_timedelta_offset(days=-1)
+        self.choice = Choice.objects.create(
+            question=self.question, choice_text="Ipsum")
+        other_question = add_question_with_timedelta_offset(days=-1)
+        self.other_choice = Choice.objects.create(
+            question=other_question, choice_text="Lorem")
+
+    def vote(self, choice_id):
+        return self.client.post(
+            reverse("polls:vote", args=(self.question.pk,)),
+            {"choice_id": choice_id})
+
+    def test_vote_counts_with_a_single_update(self):
+        """
+        Test that a vote is counted with a single UPDATE query, besides the
+        question lookup.
+        """
+        with self.assertNumQueries(2):
+            response = self.vote(self.choice.pk)
+        self.assertRedirects(
+            response, reverse("polls:results", args=(self.question.pk,)))
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.vote_tally, 1)
+
+    def test_vote_for_another_questions_choice(self):
+        """
+        Test that a choice of another question is rejected and not counted.
+        """
+        for choice_id in (self.other_choice.pk, "not a number", ""):
+            response = self.vote(choice_id)
+            self.assertContains(
+                response, "You have not selected a valid choice.")
+        self.other_choice.refresh_from_db()
+        self.assertEqual(self.other_choice.vote_tally, 0)
+
+    def test_vote_buffer_coalesces_votes(self):
+        """
+        Test that buffered votes are only written when flushed, with one
+        query per distinct vote count.
+        """
+        vote_buffer = VoteBuffer(flush_interval=3600)
+        for _ in range(3):
+            vote_buffer._votes[self.choice.pk] += 1
+        vote_buffer._votes[self.other_choice.pk] += 3
+        self.choice.refresh_from_db()
+        self.assertEqual(self.choice.vote_tally, 0)
+        with self.assertNumQueries(4):
+            # savepoint, update, questions to invalidate, savepoint release.
+            self.assertEqual(vote_buffer.flush(), 6)
+        self.choice.refresh_from_db()
+        self.other_choice.refresh_from_db()
+        self.assertEqual(
+            (self.choice.vote_tally, self.other_choice.vote_tally), (3, 3))
+
+    def test_vote_buffer_logs_failed_flushes(self):
+        """
+        Test that the flusher thread logs failed flushes and goes on.
+        """
+        vote_buffer = VoteBuffer(flush_interval=3600)
+
+        class StopFlusher(Exception):
+            pass
+
+        with mock.patch.object(
+                vote_buffer, "flush",
+                side_effect=DatabaseError("database is locked")) as flush, \
+                mock.patch("polls.utils.time.sleep",
+                           side_effect=[None, None, StopFlusher]), \
+                self.assertLogs("polls.utils", "ERROR") as logs:
+            with self.assertRaises(StopFlusher):
+                vote_buffer._flush_periodically()
+        self.assertEqual(flush.call_count, 2)
+        self.assertEqual(len(logs.records), 2)
+
+
+class QuestionResultsViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.question = add_question_with_timedelta_offset(days=-1)
+        self.choices = [
+            Choice.objects.create(
+                question=self.question, choice_text=choice_text,
+                vote_tally=vote_tally)
+            for choice_text, vote_tally in (("Ipsum", 3), ("Lorem", 1))
+        ]
+        self.url = reverse("polls:results", args=(self.question.pk,))
+
+    def test_results_percentages(self):
+        """
+        Test that the results show every choice's share of the votes.
+        """
+        response = self.client.get(self.url)
+        self.assertContains(response, "75.0%")
+        self.assertContains(response, "25.0%")
+        self.assertContains(response, "TOTAL VOTES: 4")
+
+    def test_results_are_cached(self):
+        """
+        Test that repeated results views only query for the question.
+        """
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_vote_invalidates_cached_results(self):
+        """
+        Test that a committed vote is shown by the next results view.
+        """
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("polls:vote", args=(self.question.pk,)),
+                {"choice_id": self.choices[1].pk})
+        response = self.client.get(self.url)
+        self.assertContains(response, "TOTAL VOTES: 5")
+        self.assertContains(response, "60.0%")
+
+
+class RepopulatePollsTests(TestCase):
+    def test_repopulate_replaces_polls(self):
+        """
+        Test that repopulating replaces every poll with the requested
+        number of questions and choices.
+        """
+        old_question = add_question_with_timedelta_offset(days=-1)
+        Choice.objects.create(question=old_question, choice_text="Ipsum")
+        self.assertEqual(repopulate_polls(5, 3, batch_size=2), (5, 15))
+        self.assertFalse(Question.objects.filter(pk=old_question.pk).exists())
+        self.assertEqual(Question.objects.count(), 5)
+        for question in Question.objects.all():
+            self.assertFalse(question.is_future_publication())
+            self.assertEqual(question.choice_set.count(), 3)
+
+    def test_repopulate_creates_in_bulk(self):
+        """
+        Test that the number of queries grows with the number of batches,
+        not with the number of questions.
+        """
+        # savepoint, questions to invalidate, choices delete, questions
+        # select, 2 inserts per batch, savepoint release.
+        with self.assertNumQueries(4 + 2 * 3 + 1):
+            repopulate_polls(25, 4, batch_size=10)
+        self.assertEqual(Choice.objects.count(), 100)
+
+
+class PollsDataViewsTests(TestCase):
+    def setUp(self):
+        self.question = add_question_with_timedelta_offset(days=-1)
+        self.choice = Choice.objects.create(
+            question=self.question, choice_text="Ipsum")
+
+    def login(self, is_staff: bool):
+        self.client.force_login(get_user_model().objects.create_user(
+            "staff" if is_staff else "user", is_staff=is_staff))
+
+    def test_data_views_require_post(self):
+        """
+        Test that GET requests never change the polls data.
+        """
+        self.login(is_staff=True)
+        for url, params in (
+                (reverse("polls:delete_question"), {"pk": self.question.pk}),
+                (reverse("polls:delete_choice"), {"pk": self.choice.pk}),
+                (reverse("polls:repopulate"), {})):
+            self.assertEqual(self.client.get(url, params).status_code, 405)
+        self.assertTrue(Choice.objects.filter(pk=self.choice.pk).exists())
+
+    def test_data_views_require_staff(self):
+        """
+        Test that only staff users can change the polls data.
+        """
+        self.login(is_staff=False)
+        self.client.post(
+            reverse("polls:delete_question"), {"pk": self.question.pk})
+        self.assertTrue(Question.objects.filter(pk=self.question.pk).exists())
+        self.login(is_staff=True)
+        self.client.post(
+            reverse("polls:delete_question"), {"pk": self.question.pk})
+        self.assertFalse(
+            Question.objects.filter(pk=self.question.pk).exists())
+
+    def test_delete_choice_only_redirects_to_this_site(self):
+        """
+        Test that deleting a choice doesn't redirect to other sites.
+        """
+        self.login(is_staff=True)
+        response = self.client.post(reverse("polls:delete_choice"), {
+            "pk": self.choice.pk, "source": "https://example.com/"})
+        self.assertRedirects(
+            response, reverse("polls:results", args=(self.question.pk,)))
+
+
+class VoteConcurrencyTests(TransactionTestCase):
+    voter_count = 8
+    votes_per_voter = 25
+
+    def setUp(self):
+        self.question = add_question_with_timedelta_offset(days=-1)
+        self.choice = Choice.objects.create(
+            question=self.question, choice_text="Ipsum")
+
+    def vote_concurrently(self):
+        def voter():
+            client = Client()
+            try:
+                for _ in range(self.votes_per_voter):
+                    response = client.post(
+                        reverse("polls:vote", args=(self.question.pk,)),
+                        {"choice_id": self.choice.pk})
+                    self.assertEqual(response.status_code, 302)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.voter_count) as executor:
+            for voter_future in [executor.submit(voter)
+                                 for _ in range(self.voter_count)]:
+                voter_future.result()
+
+    def test_concurrent_votes_are_not_lost(self):
+        """
+        Test that no vote is lost when many voters vote at once.
+        """
+        self.vote_concurrently()
+        self.choice.refresh_from_db()
+        self.assertEqual(
+            self.choice.vote_tally, self.voter_count * self.votes_per_voter)
+
+    @override_settings(POLLS_VOTE_WRITE_BEHIND=True)
+    def test_concurrent_buffered_votes_are_not_lost(self):
+        """
+        Test that no vote is lost when many voters vote at once through
+        the write-behind buffer.
+        """
+        # Flushed once all votes are in, so that the flusher thread never
+        # outlives the test database.
+        vote_buffer = VoteBuffer(flush_interval=3600)
+        with mock.patch(
+                "polls.views.get_vote_buffer", return_value=vote_buffer):
+            self.vote_concurrently()
+        self.assertEqual(
+            vote_buffer.flush(), self.voter_count * self.votes_per_voter)
+        self.choice.refresh_from_db()
+        self.assertEqual(
+            self.choice.vote_tally, self.voter_count * self.votes_per_voter)
@@ -9,11 +9,20 @@ Description
 # IMPORTS
 # --------------------
 # Standard library modules:
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
 from datetime import timedelta
-from random import randint, sample
+from random import randint
+from typing import Iterable, NamedTuple
 
 # Third party modules:
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 
 # Local scripts and modules:
@@ -22,28 +31,222 @@ from .models import Question, Choice
 # --------------------
 # CONSTANTS
 # --------------------
+DEFAULT_VOTE_FLUSH_INTERVAL = 1.0
+DEFAULT_RESULTS_CACHE_TIMEOUT = 60
+DEFAULT_INDEX_CACHE_TIMEOUT = 10
+LATEST_QUESTIONS_COUNT = 3
+LATEST_QUESTIONS_CACHE_KEY = "polls:latest_questions"
+DEFAULT_QUESTION_COUNT = 6
+DEFAULT_CHOICE_COUNT = 4
+DEFAULT_BATCH_SIZE = 1000
+# Generated questions are published within the last 6 days.
+PUBLICATION_SPREAD_SECONDS = int(timedelta(days=6).total_seconds())
+
+logger = logging.getLogger(__name__)
 
 
 # --------------------
 # CLASSES
 # --------------------
+class ChoiceResult(NamedTuple):
+    pk: int
+    choice_text: str
+    vote_tally: int
+    percentage: float
+
+
+class QuestionResults(NamedTuple):
+    choices: list[ChoiceResult]
+    total_votes: int
+
+
+class VoteBuffer:
+    """A write-behind buffer coalescing votes in memory.
+
+    Votes are counted per choice and flushed every flush_interval seconds
+    by a background thread (and at interpreter exit), choices that got the
+    same number of votes sharing a single
+    ``UPDATE ... SET vote_tally = vote_tally + n`` query. Votes buffered by
+    a process that dies before flushing them are lost, and results lag
+    behind votes by up to flush_interval seconds.
+    """
+
+    def __init__(self, flush_interval: float = DEFAULT_VOTE_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self._votes = Counter()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, choice_id: int, votes: int = 1):
+        """Buffer votes for a choice, starting the flusher if needed."""
+        with self._lock:
+            self._votes[choice_id] += votes
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._flush_periodically, daemon=True,
+                    name='polls-vote-buffer-flusher')
+                self._flusher.start()
+                atexit.register(self.flush)
+
+    def flush(self) -> int:
+        """Write the buffered votes to the database.
+
+        The votes are put back in the buffer if writing them fails.
+
+        :return: The number of flushed votes.
+        """
+        with self._lock:
+            votes, self._votes = self._votes, Counter()
+        choice_ids_by_votes = defaultdict(list)
+        for choice_id, choice_votes in votes.items():
+            choice_ids_by_votes[choice_votes].append(choice_id)
+        try:
+            with transaction.atomic():
+                for choice_votes, choice_ids in choice_ids_by_votes.items():
+                    Choice.objects.filter(pk__in=choice_ids).update(
+                        vote_tally=F("vote_tally") + choice_votes)
+                invalidate_question_results(
+                    Choice.objects.filter(pk__in=votes).values_list(
+                        "question_id", flat=True).distinct())
+        except Exception:
+            with self._lock:
+                self._votes.update(votes)
+            raise
+        return sum(votes.values())
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                # The votes are kept for the next attempt.
+                logger.exception(
+                    "Failed to flush the buffered votes, retrying in %ss.",
+                    self.flush_interval)
+
+
+_vote_buffer = None
+_vote_buffer_lock = threading.Lock()
 
 
 # --------------------
 # FUNCTIONS
 # --------------------
-def create_questions() -> list[Question]:
+def get_vote_buffer() -> VoteBuffer:
+    """Get the process wide VoteBuffer, creating it on first use.
+
+    The flush interval is taken from the POLLS_VOTE_FLUSH_INTERVAL setting.
+    """
+    global _vote_buffer
+    with _vote_buffer_lock:
+        if _vote_buffer is None:
+            _vote_buffer = VoteBuffer(getattr(
+                settings, "POLLS_VOTE_FLUSH_INTERVAL",
+                DEFAULT_VOTE_FLUSH_INTERVAL))
+        return _vote_buffer
+
+
+def results_cache_key(question_id: int) -> str:
+    return f"polls:results:{question_id}"
+
+
+async def aget_question_results(question_id: int) -> QuestionResults:
+    """
+    Get a question's results from the cache, computing them on a miss.
+
+    Cached results are kept for POLLS_RESULTS_CACHE_TIMEOUT seconds and are
+    invalidated whenever votes or choices of the question are committed
+    through the polls' views and utils. Choices changed any other way show
+    up once the cached results expire.
+
+    :param question_id: The pk of the question to get the results of.
+    :return: The question's choices, their vote share in percents and the
+        question's total number of votes.
+    """
+    key = results_cache_key(question_id)
+    results = await cache.aget(key)
+    if results is None:
+        choices = [
+            choice async for choice
+            in Choice.objects.filter(question_id=question_id).order_by(
+                "pk").values_list("pk", "choice_text", "vote_tally")
+        ]
+        total_votes = sum(vote_tally for _, _, vote_tally in choices)
+        results = QuestionResults(
+            choices=[
+                ChoiceResult(
+                    pk, choice_text, vote_tally,
+                    100 * vote_tally / total_votes if total_votes else 0.0)
+                for pk, choice_text, vote_tally in choices
+            ],
+            total_votes=total_votes,
+        )
+        await cache.aset(key, results, getattr(
+            settings, "POLLS_RESULTS_CACHE_TIMEOUT",
+            DEFAULT_RESULTS_CACHE_TIMEOUT))
+    return results
+
+
+def invalidate_question_results(question_ids: Iterable[int]):
+    """Drop the questions' cached results once the transaction commits."""
+    keys = [results_cache_key(question_id) for question_id in question_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+async def aget_latest_questions() -> list[Question]:
+    """
+    Get the latest published questions, newest first, from the cache.
+
+    The cached questions are kept for POLLS_INDEX_CACHE_TIMEOUT seconds at
+    most, and never past the publication date of the next future question,
+    so a question shows up as soon as it is published.
+
+    :return: The LATEST_QUESTIONS_COUNT latest questions published by now.
+    """
+    latest_questions = await cache.aget(LATEST_QUESTIONS_CACHE_KEY)
+    if latest_questions is None:
+        now = timezone.now()
+        latest_questions = [
+            question async for question
+            in Question.objects.filter(publication_date__lte=now).order_by(
+                "-publication_date")[:LATEST_QUESTIONS_COUNT]
+        ]
+        next_publication_date = await Question.objects.filter(
+            publication_date__gt=now).order_by("publication_date").values_list(
+            "publication_date", flat=True).afirst()
+        timeout = getattr(
+            settings, "POLLS_INDEX_CACHE_TIMEOUT", DEFAULT_INDEX_CACHE_TIMEOUT)
+        if next_publication_date is not None:
+            timeout = min(
+                timeout,
+                (next_publication_date - timezone.now()).total_seconds())
+        if timeout > 0:
+            await cache.aset(
+                LATEST_QUESTIONS_CACHE_KEY, latest_questions, timeout)
+    return latest_questions
+
+
+def invalidate_latest_questions():
+    """Drop the cached latest questions once the transaction commits."""
+    transaction.on_commit(lambda: cache.delete(LATEST_QUESTIONS_CACHE_KEY))
+
+
+def create_questions(count: int = DEFAULT_QUESTION_COUNT) -> list[Question]:
     return [
         Question(
             question_text="Ipsum lorem",
-            publication_date=timezone.now() - timedelta(seconds=sec_diff)
+            publication_date=timezone.now() - timedelta(
+                seconds=randint(0, PUBLICATION_SPREAD_SECONDS))
         )
-        for sec_diff
-        in sample(range(int(timedelta(days=6).total_seconds())), k=6)
+        for _
+        in range(count)
     ]
 
 
-def create_choices(questions: list[Question]) -> list[Choice]:
+def create_choices(
+        questions: list[Question], count: int = DEFAULT_CHOICE_COUNT
+) -> list[Choice]:
     return [
         Choice(
             question=question,
@@ -52,17 +255,37 @@ def create_choices(questions: list[Question]) -> list[Choice]:
             vote_tally=0,
         )
         for num
-        in range(1, 5)
+        in range(1, count + 1)
         for question
         in questions
     ]
 
 
-def repopulate_polls():
-    for model in (Question, Choice):
-        model.objects.all().delete()
-    questions = create_questions()
-    choices = create_choices(questions)
-    model_objects: list[models.Model] = [*questions, *choices]
-    for model_object in model_objects:
-        model_object.save()
+def repopulate_polls(
+        question_count: int = DEFAULT_QUESTION_COUNT,
+        choice_count: int = DEFAULT_CHOICE_COUNT,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+) -> tuple[int, int]:
+    """
+    Replace all the polls with generated ones in a single transaction.
+
+    Questions are generated and bulk created batch_size at a time, each
+    batch followed by the bulk creation of its questions' choices, so
+    seeding a large database never holds more than one batch in memory.
+
+    :param question_count: The number of questions to create.
+    :param choice_count: The number of choices to create per question.
+    :param batch_size: The number of questions created per batch.
+    :return: The number of created questions and choices.
+    """
+    with transaction.atomic():
+        invalidate_question_results(
+            Question.objects.values_list("pk", flat=True))
+        invalidate_latest_questions()
+        Choice.objects.all().delete()
+        Question.objects.only("pk").delete()
+        for batch_start in range(0, question_count, batch_size):
+            questions = Question.objects.bulk_create(create_questions(
+                min(batch_size, question_count - batch_start)))
+            Choice.objects.bulk_create(create_choices(questions, choice_count))
+    return question_count, question_count * choice_count
@@ -1,66 +1,119 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db.models import F
 from django.shortcuts import (
     render, redirect, get_object_or_404)
-from django.http import HttpRequest, HttpResponseRedirect
-from django.views.generic import DetailView, ListView
+from django.http import Http404, HttpRequest, HttpResponseRedirect
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.views.decorators.http import require_POST
+from django.views.generic import TemplateView
 from django.urls import reverse
-from django.utils import timezone
 
 from .models import Choice, Question
-from .utils import repopulate_polls
+from .utils import (
+    aget_latest_questions, aget_question_results, get_vote_buffer,
+    invalidate_latest_questions, invalidate_question_results,
+    repopulate_polls)
 
 
-class IndexView(ListView):
+async def _aget_question_or_404(queryset, pk) -> Question:
+    try:
+        return await queryset.aget(pk=pk)
+    except Question.DoesNotExist:
+        raise Http404("No question matches the given query.")
+
+
+class IndexView(TemplateView):
     template_name = "polls/index.html"
-    context_object_name = 'questions_list'
 
-    def get_queryset(self):
-        return Question.objects.filter(
-            publication_date__lte=timezone.now()).order_by(
-            '-publication_date')[:3]
+    async def get(self, request, *args, **kwargs):
+        return self.render_to_response(self.get_context_data(
+            questions_list=await aget_latest_questions(), **kwargs))
 
 
-class QuestionDetails(DetailView):
-    context_object_name = "question"
-    model = Question
+class QuestionDetails(TemplateView):
     template_name = "polls/detail.html"
 
+    async def get(self, request, *args, pk, **kwargs):
+        question = await _aget_question_or_404(
+            Question.objects.prefetch_related("choice_set"), pk)
+        return self.render_to_response(self.get_context_data(
+            question=question, **kwargs))
+
 
-class QuestionResults(DetailView):
-    context_object_name = "question"
-    model = Question
+class QuestionResults(TemplateView):
     template_name = "polls/results.html"
 
+    async def get(self, request, *args, pk, **kwargs):
+        question = await _aget_question_or_404(Question.objects, pk)
+        return self.render_to_response(self.get_context_data(
+            question=question, results=await aget_question_results(pk),
+            **kwargs))
+
 
 def vote(request, pk):
+    """Count a vote for one of the question's choices.
+
+    The vote is applied with a single atomic
+    ``UPDATE ... SET vote_tally = vote_tally + 1`` scoped to the question,
+    or handed to the write-behind VoteBuffer when the
+    POLLS_VOTE_WRITE_BEHIND setting is on. Either way the question's
+    cached results are invalidated once the vote is written.
+    """
     question = get_object_or_404(Question, pk=pk)
+    question_choices = Choice.objects.filter(question=question)
     try:
-        choice = Choice.objects.get(pk=request.POST["choice_id"])
-    except (KeyError, Choice.DoesNotExist):
+        choice_id = int(request.POST["choice_id"])
+    except (KeyError, ValueError):
+        valid_choice = False
+    else:
+        if getattr(settings, "POLLS_VOTE_WRITE_BEHIND", False):
+            valid_choice = question_choices.filter(pk=choice_id).exists()
+            if valid_choice:
+                get_vote_buffer().add(choice_id)
+        else:
+            valid_choice = bool(question_choices.filter(pk=choice_id).update(
+                vote_tally=F("vote_tally") + 1))
+            if valid_choice:
+                invalidate_question_results([question.pk])
+    if not valid_choice:
         context = {
             "question": question,
             "error_message": "You have not selected a valid choice."
         }
         return render(request, "polls/detail.html", context)
-    else:
-        choice.vote_tally += 1
-        choice.save()
     return HttpResponseRedirect(reverse("polls:results", args=(question.pk,)))
 
 
+# The views changing the polls data are for staff only, and POST only
+# so that they're protected from cross site requests.
+@require_POST
+@staff_member_required
 def repopulate(request):
     repopulate_polls()
     return redirect("polls:index")
 
 
+@require_POST
+@staff_member_required
 def delete_question(request):
-    question = get_object_or_404(Question, pk=request.GET["pk"])
+    question = get_object_or_404(Question, pk=request.POST["pk"])
     question.delete()
+    invalidate_question_results([question.pk])
+    invalidate_latest_questions()
     return redirect("polls:index")
 
 
+@require_POST
+@staff_member_required
 def delete_choice(request: HttpRequest):
-    pk = request.GET["pk"]
-    source = request.GET["source"]
+    pk = request.POST["pk"]
+    source = request.POST.get("source", "")
     choice = get_object_or_404(Choice, pk=pk)
     choice.delete()
+    invalidate_question_results([choice.question_id])
+    if not url_has_allowed_host_and_scheme(
+            source, allowed_hosts={request.get_host()},
+            require_https=request.is_secure()):
+        source = reverse("polls:results", args=(choice.question_id,))
     return redirect(source)
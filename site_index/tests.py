@@ -1,3 +1,62 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.test import TestCase
+from django.urls import reverse
+
 
 # Create your tests here.
+class IndexViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_anonymous_greeting(self):
+        """
+        Test that the async index view greets anonymous users under ASGI.
+        """
+        response = await self.async_client.get(reverse('site_index:index'))
+        self.assertContains(response, 'Welcome to the Django Testing site')
+        self.assertIn('Cookie', response.headers['Vary'])
+
+    def test_user_greeting(self):
+        """
+        Test that the index view greets a logged-in user by name, in a
+        private response.
+        """
+        self.client.force_login(User.objects.create_user('ipsum'))
+        response = self.client.get(reverse('site_index:index'))
+        self.assertContains(response, 'Hello ipsum')
+        self.assertIn('private', response.headers['Cache-Control'])
+
+    def test_conditional_get(self):
+        """
+        Test that revalidating an unchanged page gets a 304, and that the
+        page's ETag differs between users.
+        """
+        response = self.client.get(reverse('site_index:index'))
+        etag = response.headers['ETag']
+        response = self.client.get(
+            reverse('site_index:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers['ETag'], etag)
+        self.client.force_login(User.objects.create_user('ipsum'))
+        response = self.client.get(
+            reverse('site_index:index'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_fragments_are_cached(self):
+        """
+        Test that the greeting is cached per user and the application list
+        once for everyone.
+        """
+        user = User.objects.create_user('ipsum')
+        self.client.get(reverse('site_index:index'))
+        self.client.force_login(user)
+        self.client.get(reverse('site_index:index'))
+        for fragment_name, vary_on in (
+                ('site_index_greeting', [None, '']),
+                ('site_index_greeting', [user.pk, 'ipsum']),
+                ('site_index_applications', None)):
+            self.assertIsNotNone(cache.get(
+                make_template_fragment_key(fragment_name, vary_on)))
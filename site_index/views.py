@@ -1,22 +1,50 @@
+import hashlib
+
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.shortcuts import render
+from django.template.response import TemplateResponse
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers)
+from django.utils.http import quote_etag
+
+DEFAULT_CACHE_TIMEOUT = 3600
+
+
+def _index_etag(user) -> str:
+    """Get the ETag of the index page as seen by user."""
+    return quote_etag(hashlib.md5(repr((
+        user.pk, user.get_username(), settings.APPLICATION_URLS,
+    )).encode(), usedforsecurity=False).hexdigest())
 
 
 # Create your views here.
-def index(request):
+async def index(request):
+    """The site index, conditional on an ETag of the user and applications.
+
+    The greeting (per user) and the application list are cached template
+    fragments, and clients revalidating an unchanged page get a 304.
+    """
     user = request.user
-    greet_msg = (
-        f"Hello {user.username} you are at the Django Testing site index"
-        if user.is_authenticated
-        else
-        "Welcome to the Django Testing site index"
-    )
-    context = {
-        'greet_msg': greet_msg,
-        'applications': settings.APPLICATION_URLS,
-    }
-    return render(
-        request=request,
-        template_name='site_index/index.html',
-        context=context,
-    )
+    # The user is lazily loaded from the session with blocking queries.
+    is_authenticated = await sync_to_async(lambda: user.is_authenticated)()
+    etag = _index_etag(user)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        context = {
+            'applications': settings.APPLICATION_URLS,
+            'cache_timeout': getattr(
+                settings, 'SITE_INDEX_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT),
+        }
+        response = TemplateResponse(
+            request=request,
+            template='site_index/index.html',
+            context=context,
+        )
+    response.headers['ETag'] = etag
+    patch_vary_headers(response, ['Cookie'])
+    # Have clients revalidate every time, and keep a user's page out of
+    # shared caches.
+    patch_cache_control(response, no_cache=True)
+    if is_authenticated:
+        patch_cache_control(response, private=True)
+    return response
@@ -1,13 +1,13 @@
 from django.contrib.auth.forms import UserCreationForm
-from django.shortcuts import render
+from django.template.response import TemplateResponse
 from django.urls import reverse_lazy
 from django.views import View
 from django.contrib.auth.views import LoginView, LogoutView
 from django.views.generic import CreateView
 
 
-def index(request):
-    return render(request, "user_manager/index.html")
+async def index(request):
+    return TemplateResponse(request, "user_manager/index.html")
 
 
 class UserRegisterView(CreateView):
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+
+from .database import apply_sqlite_pragmas
+
+
+class UtilsConfig(AppConfig):
+    name = 'utils'
+
+    def ready(self):
+        # Project wide, every app's connections are tuned.
+        connection_created.connect(apply_sqlite_pragmas)
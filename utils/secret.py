@@ -1,41 +1,45 @@
+import os
 from pathlib import Path
-from secrets import choice, randbelow
+from secrets import SystemRandom, randbelow
 from string import ascii_lowercase, ascii_uppercase, digits, punctuation
 from typing import Iterable
 
 
 DJANGO_SECRET_TOKEN_FORMAT = 'django-secret-{}'
+DJANGO_SECRET_TOKEN_ENV_VAR = 'DJANGO_SECRET_KEY'
+DEFAULT_CHARACTER_GROUPS = (
+    (ascii_lowercase, 4),
+    (ascii_uppercase, 4),
+    (digits, 4),
+    (punctuation, 4),
+)
+
+_random = SystemRandom()
 
 class TokenGenerationError(Exception):
     pass
 
 
 def _concat_token_characters(character_groups):
-    return tuple(
-        character
-        for character_group, _ in character_groups
-        for character in character_group
-    )
+    return ''.join(character_group for character_group, _ in character_groups)
 
 
-def _gen_candidate_token(token_characters, min_token_length, max_token_length):
+def _gen_token(token_characters, min_token_length, max_token_length,
+               character_groups):
+    # Draw each group's required characters, fill up to the token length
+    # from all the groups' characters and shuffle the lot, so that every
+    # token is built in a single pass and satisfies the groups by
+    # construction.
     token_length = (
             min_token_length
-            + randbelow(max_token_length - min_token_length)
-    )
-    return ''.join(choice(token_characters) for _ in range(token_length))
-
-
-def _is_good_token(candidate_token, character_groups):
-    # Check that candidate token contains enough characters from each
-    # character group.
-    return all(
-        sum(
-            character in candidate_token for character in character_group
-        ) > min_group_characters
-        for character_group, min_group_characters
-        in character_groups
+            + randbelow(max_token_length - min_token_length + 1)
     )
+    token = []
+    for character_group, min_group_characters in character_groups:
+        token += _random.choices(character_group, k=min_group_characters)
+    token += _random.choices(token_characters, k=token_length - len(token))
+    _random.shuffle(token)
+    return ''.join(token)
 
 
 def _validate_params(min_token_length, max_token_length, character_groups):
@@ -58,42 +62,52 @@ def _validate_params(min_token_length, max_token_length, character_groups):
         )
 
 
-def gen_secret_token(
+def gen_secret_tokens(
+        count: int,
         min_token_length: int = 50,
         max_token_length: int = 60,
-        character_groups: Iterable[tuple[str, int]] = (
-                (ascii_lowercase, 4),
-                (ascii_uppercase, 4),
-                (digits, 4),
-                (punctuation, 4)
-        ),
-        max_token_generation_attempts: int = 100,
-):
+        character_groups: Iterable[tuple[str, int]] = DEFAULT_CHARACTER_GROUPS,
+) -> list[str]:
     """
+    Generate count secret tokens, e.g. to provision API keys in bulk.
 
+    Every token takes time linear in its length and can't fail once the
+    parameters are valid.
+
+    :param count: The number of tokens to generate.
     :param min_token_length: Minimal required length of secret token.
     :param max_token_length: Maximal acceptable length of secret token.
     :param character_groups: A Iterable of tuples of the structure
         (<valid token characters in group>,
          <minimal number of required characters from group>)
-    :param max_token_generation_attempts: Safety param to prevent the
-        function from getting practically stuck in an infinite loop while
-        trying to generate a secret token due to low/impossible odds of
-        generating a token answering the given parameters.
-    :return: A secret token answering the given parameters.
+    :return: count secret tokens answering the given parameters.
     """
+    character_groups = tuple(character_groups)
     _validate_params(min_token_length, max_token_length, character_groups)
     token_characters = _concat_token_characters(character_groups)
-    for generation_attempt in range(max_token_generation_attempts):
-        candidate_token = _gen_candidate_token(
-            token_characters, min_token_length, max_token_length)
-        if _is_good_token(candidate_token, character_groups):
-            return candidate_token
-    else:
-        raise TokenGenerationError(
-            'Failed to generate secret token after '
-            f'{max_token_generation_attempts} attempts.'
-        )
+    return [
+        _gen_token(token_characters, min_token_length, max_token_length,
+                   character_groups)
+        for _ in range(count)
+    ]
+
+
+def gen_secret_token(
+        min_token_length: int = 50,
+        max_token_length: int = 60,
+        character_groups: Iterable[tuple[str, int]] = DEFAULT_CHARACTER_GROUPS,
+) -> str:
+    """
+
+    :param min_token_length: Minimal required length of secret token.
+    :param max_token_length: Maximal acceptable length of secret token.
+    :param character_groups: A Iterable of tuples of the structure
+        (<valid token characters in group>,
+         <minimal number of required characters from group>)
+    :return: A secret token answering the given parameters.
+    """
+    return gen_secret_tokens(
+        1, min_token_length, max_token_length, character_groups)[0]
 
 
 def create_new_django_secret_token(token_path):
@@ -101,7 +115,22 @@ def create_new_django_secret_token(token_path):
     token_path.write_text(secret_token)
 
 
-def get_django_secret_token(token_path: Path):
-    if not token_path.exists():
+def get_django_secret_token(token_path: Path, environ=os.environ):
+    """
+    Get the Django secret token, from the environment if possible.
+
+    The token is taken from the DJANGO_SECRET_KEY environment variable
+    without touching the filesystem, otherwise it is read from token_path,
+    which is created with a new token on first use.
+
+    :param token_path: The path of the secret token file fallback.
+    :param environ: The environment to read.
+    :return: The Django secret token.
+    """
+    if secret_token := environ.get(DJANGO_SECRET_TOKEN_ENV_VAR):
+        return secret_token
+    try:
+        return token_path.read_text()
+    except FileNotFoundError:
         create_new_django_secret_token(token_path)
-    return token_path.read_text()
+        return token_path.read_text()